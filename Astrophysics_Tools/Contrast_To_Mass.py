@@ -0,0 +1,123 @@
+'''
+Turns the calcon contrast curves of a spaceKLIP reduction into mass curves.
+Every calcon result set in a directory is converted contrast -> absolute magnitude -> mass (MagToMass) and arcsec -> AU (Tools),
+whole arrays at a time, and collected into one table.
+'''
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from astropy import table
+
+from .File_Tools import CalconIndex
+from .MagToMass import Mag_to_Mass_Array
+from .Tools import Convert_Between_Arcsec_and_AU
+from .Instrumentation import timer, log
+
+
+def Contrast_to_Absolute_Magnitude(contrast, star_magnitude, distance_pc):
+    '''
+    Inputs:
+        contrast (float/array): Flux ratio of the companion to the star
+        star_magnitude (float): Apparent magnitude of the star, in the same filter as the contrast
+        distance_pc (float): Distance to the system in parsecs
+
+    Returns:
+        (np.ndarray): Absolute magnitude of a companion at that contrast, NaN where the contrast is not positive
+    '''
+    contrast = np.asarray(contrast, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        apparent_magnitude = star_magnitude - 2.5 * np.log10(np.where(contrast > 0, contrast, np.nan))
+    return apparent_magnitude - 5 * np.log10(distance_pc) + 5
+
+
+def Contrast_Curve_To_Mass_Curve(contrast, separation_arcsec, klmodes, star_magnitude, distance_pc, Age_Estimate,
+                                 Filter="NIRCAM-F444W", Instrument="NIRCAM", Mask="MASK335R"):
+    '''
+    Converts one calcon result set into a mass curve.
+
+    Inputs:
+        contrast (np.ndarray): (KL modes, separations) contrasts, as returned by Get_Contrast_Separation_From_Calcon
+        separation_arcsec (np.ndarray): The separations, either (separations,) or the same shape as contrast
+        klmodes (list): The KL mode of each row of contrast
+        star_magnitude (float): Apparent magnitude of the star in Filter
+        distance_pc (float): Distance to the system in parsecs
+        Age_Estimate (float): Age of the system in Myr
+        Filter, Instrument, Mask: As MagToMass.Mag_to_Mass
+
+    Returns:
+        (astropy.table.Table): columns klmode, separation_arcsec, separation_au, contrast, abs_mag, mass_mjup.
+            One row per KL mode and separation, masses are NaN outside the models.
+    '''
+    contrast = np.atleast_2d(np.asarray(contrast, dtype=float))
+    separation_arcsec = np.broadcast_to(np.asarray(separation_arcsec, dtype=float), contrast.shape)
+    if len(klmodes) != contrast.shape[0]:
+        raise ValueError(f"{len(klmodes)} KL modes were given for {contrast.shape[0]} contrast curves")
+
+    abs_mag = Contrast_to_Absolute_Magnitude(contrast, star_magnitude, distance_pc)
+    mass_mjup = Mag_to_Mass_Array(Age_Estimate, abs_mag, Filter=Filter, Instrument=Instrument, Mask=Mask, Verbose=False)
+    separation_au = Convert_Between_Arcsec_and_AU(distance_pc, separation_arcsec=separation_arcsec)
+
+    return table.Table({"klmode": np.repeat(klmodes, contrast.shape[1]),
+                        "separation_arcsec": separation_arcsec.ravel(),
+                        "separation_au": separation_au.ravel(),
+                        "contrast": contrast.ravel(),
+                        "abs_mag": abs_mag.ravel(),
+                        "mass_mjup": mass_mjup.ravel()})
+
+
+def _Convert_Calcon_Set(calcon_index, calcon_set, star_magnitude, distance_pc, Age_Estimate, Filter, Instrument, Mask):
+    contrast = calcon_index.load(calcon_set["contrast_path"])
+    separation_arcsec = calcon_index.load(calcon_set["separation_arcsec_path"])
+    key = (calcon_set["differential_imaging_method"], calcon_set["number_of_annuli"], calcon_set["number_of_subsections"])
+    if calcon_set["injection_file"] is not None:
+        klmodes = calcon_index.klmodes(*key, tag=calcon_set["tag"])
+    else:
+        klmodes = list(range(np.atleast_2d(contrast).shape[0]))  # no injection files to read the KL modes from, number the curves instead
+    mass_curve = Contrast_Curve_To_Mass_Curve(contrast, separation_arcsec, klmodes, star_magnitude, distance_pc, Age_Estimate,
+                                              Filter=Filter, Instrument=Instrument, Mask=Mask)
+    for column in ("tag", "number_of_subsections", "number_of_annuli", "differential_imaging_method"):
+        mass_curve.add_column(calcon_set[column], name=column, index=0)
+    return mass_curve
+
+
+def Contrast_To_Mass_Table(calcon_dir, star_magnitude, distance_pc, Age_Estimate, Filter="NIRCAM-F444W", Instrument="NIRCAM",
+                           Mask="MASK335R", include_transmistion_mask=True, Output=None, max_workers=None, use_index=False,
+                           verbose=True):
+    '''
+    Converts every calcon result set (all methods, annuli and subsections) in a directory into mass curves.
+    The sets are independent, so they are loaded and converted in parallel threads.
+
+    Inputs:
+        calcon_dir (str/CalconIndex): The directory containing the calcon files, or an index of it.
+        star_magnitude (float): Apparent magnitude of the star in Filter
+        distance_pc (float): Distance to the system in parsecs
+        Age_Estimate (float): Age of the system in Myr
+        Filter, Instrument, Mask: As MagToMass.Mag_to_Mass
+        include_transmistion_mask (bool): Use the transmission mask corrected contrasts.
+        Output (str/None): If given, the table is also written here, the format follows the extension (e.g. .ecsv, .fits, .csv)
+        max_workers (int/None): Number of threads converting sets.
+        use_index (bool/HeaderIndex): Read the KL modes through a HeaderIndex, see File_Tools.Read_KLmodes (when calcon_dir is a path)
+        verbose (bool): Print each set as it is converted (logged instead once logging is set up, see Instrumentation).
+
+    Returns:
+        (astropy.table.Table): differential_imaging_method, number_of_annuli, number_of_subsections, tag (see
+            File_Tools.CalconIndex.paths) and the columns of Contrast_Curve_To_Mass_Curve, for every set in the order they are found.
+    '''
+    calcon_index = calcon_dir if isinstance(calcon_dir, CalconIndex) else CalconIndex(calcon_dir, use_index=use_index)
+    calcon_sets = calcon_index.sets(include_transmistion_mask=include_transmistion_mask)
+    if not calcon_sets:
+        raise FileNotFoundError(f"No calcon result sets found in {calcon_index.calcon_dir}")
+
+    def convert(calcon_set):
+        start = time.perf_counter()
+        with timer("Contrast_To_Mass.convert_set"):
+            mass_curve = _Convert_Calcon_Set(calcon_index, calcon_set, star_magnitude, distance_pc, Age_Estimate, Filter, Instrument, Mask)
+        log(f"Converted {calcon_set['contrast_path']}", verbose, start)
+        return mass_curve
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        mass_table = table.vstack(list(executor.map(convert, calcon_sets)))
+    if Output is not None:
+        mass_table.write(Output, overwrite=True)
+    return mass_table
@@ -1,115 +1,486 @@
+import asyncio
 import glob
 import os
 from astropy.io import fits
 import numpy as np
 import re
 import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .Header_Index import HeaderIndex
+from .Instrumentation import count, timer, log, fits_header_bytes
 
-def Find_File_Types(init_path, file_types = ["Background", "Science", "Reference", "TA"], verbose = True):
-	'''Finds all the files of specified types in a directory and returns them as lists.'''
-	def Find_Backgrounds(fits_files):
+FILE_TYPES = ["Background", "Science", "Reference", "TA"]
+CLASSIFIER_KEYWORDS = ["BKGDTARG", "IS_PSF", "EXP_TYPE"]
+
+def Read_Header_Keywords(fits_file, keywords = CLASSIFIER_KEYWORDS):
+	'''
+	Reads the primary header of a fits file once, and keeps only the keywords asked for.
+
+	Args:
+		fits_file (str): The path to the fits file.
+		keywords (list): The primary header keywords to keep.
+
+	Returns:
+		dict: The keyword values, keywords missing from the header are left out.
+	'''
+	with timer("File_Tools.read_header"):
+		header = fits.getheader(fits_file, ext = 0)
+	count("files_opened")
+	count("bytes_read", fits_header_bytes(header))
+	return {key: header[key] for key in keywords if key in header}
+
+
+def Classify_Header(header):
+	'''
+	Sorts a primary header into the file types used by Find_File_Types.
+	A file can fall into more than one type (e.g. a PSF reference target acquisition).
+
+	Args:
+		header (dict or fits.Header): Primary header, or the keywords read by Read_Header_Keywords.
+
+	Returns:
+		list: The file types ("Background", "Science", "Reference", "TA") the header belongs to.
+	'''
+	is_background = bool(header.get('BKGDTARG', False))
+	is_psf = bool(header.get('IS_PSF'))
+	is_acquisition = str(header.get("EXP_TYPE", "")).endswith("ACQ")
+
+	file_types = []
+	if is_background:
+		file_types.append("Background")
+	if not is_psf and not is_background and not is_acquisition:
+		file_types.append("Science")
+	if is_psf and not is_background:
+		file_types.append("Reference")
+	if is_acquisition:
+		file_types.append("TA")
+	return file_types
+
+
+def _Classify_File(fits_file):
+	return fits_file, Classify_Header(Read_Header_Keywords(fits_file))
+
+
+def Iterate_File_Types(init_path, file_types = FILE_TYPES, max_workers = None):
+	'''
+	Classifies the fits files in a directory, yielding each file as soon as its header has been read.
+	Every header is only read once, the reads are spread over a thread pool.
+
+	Args:
+		init_path (str): The path to the directory containing the files.
+		file_types (list): The file types to yield, any of "Background", "Science", "Reference", "TA".
+		max_workers (int/None): Number of threads used to read the headers, None lets python decide.
+
+	Yields:
+		tuple: (path, file type), in the order the headers finish being read.
+	'''
+	fits_files = glob.glob(os.path.join(init_path, '*.fits'))
+	with ThreadPoolExecutor(max_workers = max_workers) as executor:
+		futures = [executor.submit(_Classify_File, fits_file) for fits_file in fits_files]
+		for future in as_completed(futures):
+			fits_file, found_types = future.result()
+			for file_type in found_types:
+				if file_type in file_types:
+					yield fits_file, file_type
+
+
+def _Indexed_Headers(use_index, directory, fits_files):
+	'''Reads headers through a HeaderIndex, use_index is either True (the directory's default index) or a HeaderIndex.'''
+	if isinstance(use_index, HeaderIndex):
+		return use_index.headers(fits_files)
+	with HeaderIndex(directory) as index:
+		return index.headers(fits_files)
+
+
+def Find_File_Types(init_path, file_types = FILE_TYPES, verbose = True, max_workers = None, use_index = False, as_table = False):
+	'''
+	Finds all the files of specified types in a directory and returns them as lists.
+
+	Args:
+		init_path (str): The path to the directory containing the files.
+		file_types (list): Any of "Background", "Science", "Reference", "TA".
+		verbose (bool): Whether to print how many files of each type were found (logged instead once logging is set up, see Instrumentation).
+		max_workers (int/None): Number of threads used to read the headers, None lets python decide.
+		use_index (bool/HeaderIndex): Read the headers through the directory's HeaderIndex (or the one given),
+			only files that are new or changed since the last call are opened.
+		as_table (bool): Return a FileTypeTable, which also holds each file's filter, pupil, target and integration/group counts
+			(read in the same header read), rather than the lists of paths.
+
+	Returns:
+		dict: {"Background": [...], "Science": [...], "Reference": [...], "TA": [...]}, types not asked for are empty.
+		FileTypeTable: when as_table is True, one row per file and type asked for.
+	'''
+	start = time.perf_counter()
+	headers = {}
+	if any(file_type in FILE_TYPES for file_type in file_types):
+		fits_files = glob.glob(os.path.join(init_path, '*.fits'))
+		if use_index:
+			headers = _Indexed_Headers(use_index, init_path, fits_files)
+		else:
+			with ThreadPoolExecutor(max_workers = max_workers) as executor:
+				# map keeps the glob order, so the lists match reading the files one by one
+				headers = dict(executor.map(_Read_Table_Keywords, fits_files))
+
+	if as_table:
+		returns = FileTypeTable.from_headers(headers, file_types)
+		returns_dict = returns.to_dict()
+	else:
+		returns_dict = {file_type: [] for file_type in FILE_TYPES}
+		for fits_file, header in headers.items():
+			for file_type in Classify_Header(header):
+				if file_type in file_types:
+					returns_dict[file_type].append(fits_file)
+		returns = returns_dict
+
+	if verbose:
+		names = {"Background": "background", "Science": "science", "Reference": "reference", "TA": "target acquisition"}
+		for file_type in file_types:
+			if file_type in names:
+				log(f"Found {len(returns_dict[file_type])} {names[file_type]} files.", start = start)
+			else:
+				log(f"Unknown file type: {file_type}")
+	return returns
+
+
+TABLE_KEYWORDS = CLASSIFIER_KEYWORDS + ["FILTER", "PUPIL", "TARGPROP", "NINTS", "NGROUPS"]
+
+def _Read_Table_Keywords(fits_file):
+	return fits_file, Read_Header_Keywords(fits_file, TABLE_KEYWORDS)
+
+
+class FileTypeTable:
+	'''
+	The files of a directory as columns, one row per file and file type (a file can be of more than one type),
+	so they can be filtered and grouped on their header values without going back to the files.
+
+	Columns (numpy arrays):
+		path, category (the file type), EXP_TYPE, FILTER, PUPIL, TARGPROP: str, "" where the header lacks the keyword.
+		NINTS, NGROUPS: int, -1 where the header lacks the keyword.
+
+	Usage:
+		table = Find_File_Types(uncal_dir, as_table = True)
+		references = table.filter(category = "Reference", FILTER = ["F356W", "F444W"])
+		for (filter_name, category), files in table.group_by("FILTER", "category").items():
+			...
+		table.to_dict()   # the lists Find_File_Types returns by default
+	'''
+	STRING_COLUMNS = ["path", "category", "EXP_TYPE", "FILTER", "PUPIL", "TARGPROP"]
+	INTEGER_COLUMNS = ["NINTS", "NGROUPS"]
+
+	def __init__(self, columns):
+		self.columns = {name: np.asarray(columns[name], dtype = str) for name in self.STRING_COLUMNS}
+		self.columns.update({name: np.asarray(columns[name], dtype = np.int64) for name in self.INTEGER_COLUMNS})
+
+	@classmethod
+	def from_headers(cls, headers, file_types = FILE_TYPES):
 		'''
-		Finds all the background files in a directory, and returns them as a list.
-		
-		Args:
-			init_path (str): The path to the directory containing the files.
-		
-		Returns:
-			list: A list of paths to the background files.
-		'''
-		_background_files = []
-		for fits_file in fits_files:
-			header = fits.getheader(fits_file, ext = 0)
-			if header.get('BKGDTARG', False):
-				_background_files.append(fits_file)	
-		return _background_files
-
-	def Find_Science(fits_files):
-		'''
-		Finds all the science files in a directory, and returns them as a list.
-		
-		Args:
-			init_path (str): The path to the directory containing the files.
-		
-		Returns:
-			list: A list of paths to the science files.
-		'''
-		_science_files = []
-		for fits_file in fits_files:
-			header = fits.getheader(fits_file, ext = 0)
-			if not header.get('IS_PSF') and not header.get('BKGDTARG', False) and not header.get("EXP_TYPE", "").endswith("ACQ"):
-				_science_files.append(fits_file)	
-		return _science_files
-
-	def Find_References(fits_files):
-		'''
-		Finds all the reference files in a directory, and returns them as a list.
-		
-		Args:
-			init_path (str): The path to the directory containing the files.
-		
+		Builds the table from {path: header} (a fits.Header or the dict of Read_Header_Keywords with TABLE_KEYWORDS),
+		keeping the rows of the file types asked for.
+		'''
+		columns = {name: [] for name in cls.STRING_COLUMNS + cls.INTEGER_COLUMNS}
+		for fits_file, header in headers.items():
+			for file_type in Classify_Header(header):
+				if file_type not in file_types:
+					continue
+				columns["path"].append(fits_file)
+				columns["category"].append(file_type)
+				for name in cls.STRING_COLUMNS[2:]:
+					value = header.get(name)
+					columns[name].append("" if value is None else str(value))
+				for name in cls.INTEGER_COLUMNS:
+					value = header.get(name)
+					columns[name].append(-1 if value is None else int(value))
+		return cls(columns)
+
+	def __len__(self):
+		return len(self.columns["path"])
+
+	def __getitem__(self, name):
+		return self.columns[name]
+
+	def __repr__(self):
+		return f"FileTypeTable({len(self)} rows: {', '.join(f'{count} {name}' for name, count in zip(*np.unique(self.columns['category'], return_counts = True)))})"
+
+	def take(self, rows):
+		'''The rows given by an index array or boolean mask, as a new table.'''
+		return FileTypeTable({name: column[rows] for name, column in self.columns.items()})
+
+	def filter(self, mask = None, **values):
+		'''
+		The rows matching a boolean mask and every column=value given, where a list (or array) of values matches any of them,
+		e.g. table.filter(category = "Science", NGROUPS = [5, 10]) or table.filter(table["NINTS"] > 1).
+		'''
+		keep = np.ones(len(self), dtype = bool) if mask is None else np.asarray(mask, dtype = bool).copy()
+		for name, value in values.items():
+			if isinstance(value, (list, tuple, set, np.ndarray)):
+				keep &= np.isin(self.columns[name], list(value))
+			else:
+				keep &= self.columns[name] == value
+		return self.take(keep)
+
+	def unique(self, name):
+		return np.unique(self.columns[name])
+
+	def group_by(self, *names):
+		'''
+		Splits the table on the values of one or more columns.
+
 		Returns:
-			list: A list of paths to the reference files.
-		'''
-		_reference_files = []
-		for fits_file in fits_files:
-			header = fits.getheader(fits_file, ext = 0)
-			if header.get('IS_PSF') and not header.get('BKGDTARG', False):
-				_reference_files.append(fits_file)
-		return _reference_files
-	
+			dict: {value: FileTypeTable} for one column, {(value, value, ...): FileTypeTable} for more, in sorted key order.
+		'''
+		if len(self) == 0:
+			return {}
+		uniques, codes = zip(*(np.unique(self.columns[name], return_inverse = True) for name in names))
+		shape = tuple(len(unique) for unique in uniques)
+		group_values, group_index = np.unique(np.ravel_multi_index(codes, shape), return_inverse = True)
+		order = np.argsort(group_index, kind = "stable")  # stable, so each group keeps the table's order
+		groups = {}
+		for group_value, rows in zip(group_values, np.split(order, np.cumsum(np.bincount(group_index))[:-1])):
+			key = tuple(unique[code].item() for unique, code in zip(uniques, np.unravel_index(group_value, shape)))
+			groups[key[0] if len(names) == 1 else key] = self.take(rows)
+		return groups
+
+	def to_dict(self):
+		'''The {"Background": [...], "Science": [...], "Reference": [...], "TA": [...]} lists of paths Find_File_Types returns by default.'''
+		return {file_type: self.columns["path"][self.columns["category"] == file_type].tolist() for file_type in FILE_TYPES}
+
+	def to_pandas(self):
+		import pandas as pd  # only when asked for, pandas is slow to import
+		return pd.DataFrame(self.columns)
+
+
+
+def _Read_Complete_Primary_Header(fits_file):
+	'''
+	The primary header of a fits file, or None while the file is shorter than its headers say it should be
+	(still being written, or cut short). Every HDU's header is read to find where its data ends, the data itself is skipped.
+	A file cut between two HDUs looks whole unless the primary header gives the number of extensions (NEXTEND).
+	'''
+	size = os.path.getsize(fits_file)
+	primary_header = None
+	n_hdus = 0
+	position = 0
+	with open(fits_file, "rb") as file:
+		while position < size:
+			file.seek(position)
+			try:
+				header = fits.Header.fromfile(file)
+			except (OSError, EOFError, ValueError):
+				return None  # the header itself is incomplete
+			if primary_header is None:
+				primary_header = header
+			n_hdus += 1
+			naxis = header.get("NAXIS", 0)
+			elements = int(np.prod([header.get(f"NAXIS{axis}", 0) for axis in range(1, naxis + 1)])) if naxis else 0
+			data_bytes = abs(header.get("BITPIX", 8)) // 8 * header.get("GCOUNT", 1) * (header.get("PCOUNT", 0) + elements)
+			position = file.tell() + 2880 * -(-data_bytes // 2880)
+	count("files_opened")
+	count("bytes_read", fits_header_bytes(primary_header) if primary_header is not None else 0)
+	if position > size or (primary_header is not None and n_hdus < 1 + primary_header.get("NEXTEND", 0)):
+		return None
+	return primary_header
 
-	def Find_Target_Acquisitions(fits_files):
+
+def _Try_Classify_File(fits_file):
+	# None for a file that is incomplete, unreadable or gone again, it is then retried once it changes
+	try:
+		header = _Read_Complete_Primary_Header(fits_file)
+	except OSError:
+		header = None
+	return fits_file, None if header is None else Classify_Header(header)
+
+
+class DirectoryWatcher:
+	'''
+	Watches a directory for fits files arriving, classifying each new file once (see Classify_Header) rather than
+	re-reading the whole directory as Find_File_Types does.
+
+	A poll stats the directory and only lists it when its modification time has moved (a file was added, removed or renamed),
+	then reads the headers of the new files alone, so a poll costs one stat when nothing arrived and a header read per new file
+	otherwise. A fits header is written before the data, so a file is only reported once it is complete: its size and
+	modification time are the same on two polls in a row, and it is as long as its headers say (every HDU's header and data).
+	Files that are still short, or whose header cannot be read, are retried once they change again.
+	Files changed in place after being reported are not re-classified.
+
+	Args:
+		init_path (str): The directory to watch.
+		file_types (list): The file types to report, any of "Background", "Science", "Reference", "TA".
+		callback (callable/None): Called as callback(path, file type) for every new file of the types watched.
+		interval (float): Seconds between polls in watch and the async iteration.
+		include_existing (bool): Report the files already in the directory (from the second poll), otherwise only later arrivals.
+		max_workers (int/None): Number of threads used to read the headers when several files arrive at once.
+		verbose (bool): Whether to print what each poll found (logged instead once logging is set up, see Instrumentation).
+
+	Attributes:
+		classified (dict): {path: file types} of every file classified so far.
+		stats (dict): polls, listings (polls that had to list the directory), classified, retried and removed files.
+
+	Usage:
+		watcher = DirectoryWatcher(uncal_dir, callback = lambda path, file_type: print(path, file_type))
+		watcher.watch()                          # until watcher.stop()
+	or, from a coroutine:
+		async for fits_file, file_type in DirectoryWatcher(uncal_dir, ["Science"]):
+			...
+	'''
+	# file systems with coarse timestamps (down to 2 s) can add a file without moving the directory's modification time,
+	# so the listing is only skipped once the directory was last listed this long after it last changed
+	MTIME_RESOLUTION_NS = 2_000_000_000
+
+	def __init__(self, init_path, file_types = FILE_TYPES, callback = None, interval = 1.0, include_existing = True,
+				 max_workers = None, verbose = False):
+		self.init_path = init_path
+		self.file_types = file_types
+		self.callback = callback
+		self.interval = interval
+		self.max_workers = max_workers
+		self.verbose = verbose
+		self.classified = {}
+		self.stats = {"polls": 0, "listings": 0, "classified": 0, "retried": 0, "removed": 0}
+		self._seen = set()  # every fits file listed so far, classified or not
+		self._pending = {}  # path -> (mtime_ns, size) at the last poll, of files not classified yet
+		self._unreadable = {}  # path -> (mtime_ns, size) of settled files whose header could not be read
+		self._listed_mtime_ns = None  # the directory's modification time when it was last listed
+		self._listed_at_ns = None
+		self._stopped = False
+		if not include_existing:
+			self._seen.update(self._list_changes()[0])
+
+	def _list_changes(self):
+		'''The fits files added to the directory since it was last listed (empty without listing it when it has not changed).'''
+		mtime_ns = os.stat(self.init_path).st_mtime_ns
+		if (mtime_ns == self._listed_mtime_ns and self._listed_at_ns - mtime_ns > self.MTIME_RESOLUTION_NS):
+			return [], []
+		listed_at_ns = time.time_ns()
+		with timer("File_Tools.list_directory"):
+			fits_files = {entry.path for entry in os.scandir(self.init_path)
+						  if entry.name.endswith(".fits") and not entry.name.startswith(".") and entry.is_file()}
+		self._listed_mtime_ns, self._listed_at_ns = mtime_ns, listed_at_ns
+		self.stats["listings"] += 1
+		return sorted(fits_files - self._seen), sorted(self._seen - fits_files)
+
+	@staticmethod
+	def _signature(fits_file):
+		try:
+			stat = os.stat(fits_file)
+		except FileNotFoundError:
+			return None  # gone again, the next listing sees it as removed
+		return stat.st_mtime_ns, stat.st_size
+
+	def _settled_files(self):
+		'''
+		The pending files whose size and modification time have not changed since the last poll, ready to be read.
+		Those still changing keep waiting, unreadable files that have changed wait to settle again.
 		'''
-		Finds all the target acquisition files in a directory, and returns them as a list.
-		
-		Args:
-			init_path (str): The path to the directory containing the files.
-		
+		settled = []
+		for fits_file, signature in list(self._pending.items()):
+			current = self._signature(fits_file)
+			if current is None:
+				del self._pending[fits_file]
+			elif current == signature:
+				settled.append(fits_file)
+			else:
+				self._pending[fits_file] = current
+		for fits_file, signature in list(self._unreadable.items()):
+			current = self._signature(fits_file)
+			if current != signature:
+				del self._unreadable[fits_file]
+				if current is not None:
+					self._pending[fits_file] = current
+					self.stats["retried"] += 1
+		return settled
+
+	def _classify(self, fits_files):
+		if len(fits_files) > 1 and self.max_workers != 1:
+			with ThreadPoolExecutor(max_workers = self.max_workers) as executor:
+				return list(executor.map(_Try_Classify_File, fits_files))
+		return [_Try_Classify_File(fits_file) for fits_file in fits_files]
+
+	def poll(self):
+		'''
+		Looks for new files once, classifies those that have finished arriving and passes each to the callback.
+
 		Returns:
-			list: A list of paths to the target acquisition files.
-		'''
-		_target_acquisition_files = []
-		for fits_file in fits_files:
-			header = fits.getheader(fits_file, ext = 0)
-			if header.get("EXP_TYPE", "").endswith("ACQ"):
-				_target_acquisition_files.append(fits_file)
-		return _target_acquisition_files
-	
+			list: (path, file type) of the newly complete files, for the file types watched, in path order.
+		'''
+		start = time.perf_counter()
+		self.stats["polls"] += 1
+		count("watcher_polls")
+		settled = self._settled_files()
+		new_files, removed_files = self._list_changes()
+		for fits_file in removed_files:
+			self._seen.discard(fits_file)
+			self.classified.pop(fits_file, None)
+			self._pending.pop(fits_file, None)
+			self._unreadable.pop(fits_file, None)
+		self.stats["removed"] += len(removed_files)
+		self._seen.update(new_files)
+		for fits_file in new_files:
+			signature = self._signature(fits_file)
+			if signature is not None:
+				self._pending[fits_file] = signature
 
-	fits_files = glob.glob(os.path.join(init_path, '*.fits'))
-	for file_type in file_types:
-		if file_type == "Background":
-			background_files = Find_Backgrounds(fits_files)
-			if verbose:
-				print(f"Found {len(background_files)} background files.")
-		elif file_type == "Science":
-			science_files = Find_Science(fits_files)
-			if verbose:
-				print(f"Found {len(science_files)} science files.")
-		elif file_type == "Reference":
-			reference_files = Find_References(fits_files)
-			if verbose:
-				print(f"Found {len(reference_files)} reference files.")
-		elif file_type == "TA":
-			target_acquisition_files = Find_Target_Acquisitions(fits_files)
-			if verbose:
-				print(f"Found {len(target_acquisition_files)} target acquisition files.")
-		else:
-			if verbose:
-				print(f"Unknown file type: {file_type}")
+		found = []
+		for fits_file, found_types in self._classify([fits_file for fits_file in settled if fits_file in self._pending]):
+			signature = self._pending.pop(fits_file)
+			if found_types is None:
+				self._unreadable[fits_file] = signature
+				continue
+			self.classified[fits_file] = found_types
+			self.stats["classified"] += 1
+			found.extend((fits_file, file_type) for file_type in found_types if file_type in self.file_types)
+		found.sort()
+
+		if self.callback is not None:
+			for fits_file, file_type in found:
+				self.callback(fits_file, file_type)
+		if found or removed_files:
+			log(f"{len(found)} new files, {len(removed_files)} removed, {len(self._pending) + len(self._unreadable)} waiting to finish arriving.", self.verbose, start = start)
+		return found
+
+	def file_types_dict(self):
+		'''Every file classified so far, as Find_File_Types returns them: {"Background": [...], "Science": [...], ...}.'''
+		returns_dict = {file_type: [] for file_type in FILE_TYPES}
+		for fits_file in sorted(self.classified):
+			for file_type in self.classified[fits_file]:
+				if file_type in self.file_types:
+					returns_dict[file_type].append(fits_file)
+		return returns_dict
+
+	def stop(self):
+		'''Makes watch (or the async iteration) return after the poll in progress, from a callback or another thread.'''
+		self._stopped = True
+
+	def watch(self, timeout = None):
+		'''
+		Polls every interval seconds until stop() is called or timeout seconds have passed (None for no limit).
 
-	# Return all found files
-	returns_dict = {"Background": locals().get('background_files', []),
-					"Science": locals().get('science_files', []),
-					"Reference": locals().get('reference_files', []),
-					"TA": locals().get('target_acquisition_files', [])}
-	return returns_dict
+		Returns:
+			dict: Every file classified, see file_types_dict.
+		'''
+		self._stopped = False
+		end = None if timeout is None else time.monotonic() + timeout
+		while True:
+			self.poll()
+			if self._stopped or (end is not None and time.monotonic() + self.interval > end):
+				break
+			time.sleep(self.interval)
+		return self.file_types_dict()
+
+	async def __aiter__(self):
+		# the polls run in a thread, so header reads never block the event loop
+		self._stopped = False
+		while True:
+			for fits_file, file_type in await asyncio.to_thread(self.poll):
+				yield fits_file, file_type
+			if self._stopped:
+				return
+			await asyncio.sleep(self.interval)
 
 
 def Get_Contrast_Separation_From_Calcon(calcon_dir, differential_imaging_method = "ADI+RDI", 
 										number_of_annuli = 1, number_of_subsections = 1, 
-										include_transmistion_mask = True, verbose = True):
+										include_transmistion_mask = True, verbose = True, use_index = False, calcon_index = None, tag = None):
 	'''
 	Extracts contrast and separation data from a calcon file.
 	Args:
@@ -118,34 +489,219 @@ def Get_Contrast_Separation_From_Calcon(calcon_dir, differential_imaging_method
 		number_of_annuli (int): The number of annuli used in the analysis.
 		number_of_subsections (int): The number of subsections used in the analysis.
 		include_transmistion_mask (bool): Whether to include the transmission mask in the analysis.
-		verbose (bool): Whether to print verbose output.
+		verbose (bool): Whether to print verbose output (logged instead once logging is set up, see Instrumentation).
+		use_index (bool/HeaderIndex): Read the injection file's header through a HeaderIndex of its directory (or the one given).
+		calcon_index (CalconIndex/None): An index of calcon_dir to look the files up in rather than globbing the directory,
+			the arrays are then memory mapped (read only) and the KL modes cached between calls.
+		tag (str/None): The tag of the set, the part of the file names between NSUBS<n> and -KLmodes, for a combination saved
+			under more than one. With calcon_index it is required then, see CalconIndex.paths.
 	Returns:
 		tuple: A tuple containing the contrast and separation data.
 	'''
+	if calcon_index is not None:
+		kind = 'maskcons' if include_transmistion_mask else 'cons'
+		paths = calcon_index.paths(differential_imaging_method, number_of_annuli, number_of_subsections, tag, (kind, "seps"))
+		log(f"loading {paths[kind]}", verbose)
+		log(f"loading {paths['seps']}", verbose)
+		return calcon_index.get(differential_imaging_method, number_of_annuli, number_of_subsections, include_transmistion_mask, tag)
 
 	#find the files
-	glob_path = f"{calcon_dir}/{differential_imaging_method}_NANNU{number_of_annuli}_NSUBS{number_of_subsections}*-KLmodes-all_cal_"
+	tag_pattern = "*" if tag is None else glob.escape(tag)
+	glob_path = f"{calcon_dir}/{differential_imaging_method}_NANNU{number_of_annuli}_NSUBS{number_of_subsections}{tag_pattern}-KLmodes-all_cal_"
 	if include_transmistion_mask:
 		contrast_path = glob.glob(glob_path + "maskcons.npy")[0]
 	else:
 		contrast_path = glob.glob(glob_path + "cons.npy")[0]
-	if verbose:
-		print(f"loading {contrast_path}")
+	log(f"loading {contrast_path}", verbose)
 
 	separation_arcsec_path = glob.glob(glob_path + "seps.npy")[0]
-	if verbose:
-		print(f"loading {separation_arcsec_path}")
+	log(f"loading {separation_arcsec_path}", verbose)
 	
 	
 	#load the data
-	contrast = np.load(contrast_path)
-	separation_arcsec = np.load(separation_arcsec_path)
+	with timer("File_Tools.load_calcon"):
+		contrast = np.load(contrast_path)
+		separation_arcsec = np.load(separation_arcsec_path)
+	count("files_opened", 2)
+	count("bytes_read", contrast.nbytes + separation_arcsec.nbytes)
 	
 	#find the KL modes:
-	injection_file = glob.glob(f"{calcon_dir}/{differential_imaging_method}_NANNU{number_of_annuli}_NSUBS{number_of_subsections}*/*.fits")[0]
-	header = fits.getheader(injection_file)
-	klmode_keys = [key for key in header if re.match(r"KLMODE\d+$",key)]
-	klmode_values = [header[key] for key in klmode_keys]
+	injection_file = glob.glob(f"{calcon_dir}/{differential_imaging_method}_NANNU{number_of_annuli}_NSUBS{number_of_subsections}{tag_pattern}/*.fits")[0]
+	klmode_values = Read_KLmodes(injection_file, use_index = use_index)
 
 	return contrast, separation_arcsec, klmode_values
 
+
+def Read_KLmodes(injection_file, use_index = False):
+	'''
+	Reads the KL modes (the KLMODE<n> keywords) from the header of a calcon injection file.
+	Args:
+		injection_file (str): The injection fits file.
+		use_index (bool/HeaderIndex): Read the header through a HeaderIndex of its directory (or the one given).
+	Returns:
+		list: The KL modes, in header order.
+	'''
+	if use_index:
+		header = _Indexed_Headers(use_index, os.path.dirname(injection_file), [injection_file])[injection_file]
+	else:
+		header = fits.getheader(injection_file)
+		count("files_opened")
+		count("bytes_read", fits_header_bytes(header))
+	klmode_keys = [key for key in header if re.match(r"KLMODE\d+$",key)]
+	return [header[key] for key in klmode_keys]
+
+
+CALCON_FILE_PATTERN = re.compile(r"^(?P<method>.+?)_NANNU(?P<annuli>\d+)_NSUBS(?P<subsections>\d+)(?P<tag>.*)-KLmodes-all_cal_(?P<kind>maskcons|cons|seps)\.npy$")
+CALCON_DIR_PATTERN = re.compile(r"^(?P<method>.+?)_NANNU(?P<annuli>\d+)_NSUBS(?P<subsections>\d+)(?!\d)(?P<tag>.*)$")
+
+class CalconIndex:
+	'''
+	Scans a calcon directory once, parsing every file name into its (method, number of annuli, number of subsections),
+	so the contrast/separation files and KL modes of any combination are found without listing the directory again.
+	The arrays are loaded lazily and memory mapped, the KL modes are read from the injection file header once and kept.
+
+	Args:
+		calcon_dir (str): The directory containing the calcon files.
+		use_index (bool/HeaderIndex): Read the injection file headers through a HeaderIndex, see Read_KLmodes.
+
+	Usage:
+		index = CalconIndex(calcon_dir)
+		contrast, separation_arcsec, klmodes = index.get("ADI+RDI", 1, 1)
+	'''
+	def __init__(self, calcon_dir, use_index = False):
+		self.calcon_dir = calcon_dir
+		self.use_index = use_index
+		self._files = {}  # (method, annuli, subsections) -> {tag: {kind: path}}
+		self._injection_files = {}  # (method, annuli, subsections) -> {tag: first injection fits file of the tag's directory}
+		self._klmodes = {}
+		self._arrays = {}
+
+		injection_dirs = []
+		for entry in sorted(os.scandir(calcon_dir), key = lambda entry: entry.name):
+			if entry.is_dir():
+				match = CALCON_DIR_PATTERN.match(entry.name)
+				if match is not None:
+					injection_dirs.append((match, entry.path))
+				continue
+			match = CALCON_FILE_PATTERN.match(entry.name)
+			if match is not None:
+				key = (match["method"], int(match["annuli"]), int(match["subsections"]))
+				self._files.setdefault(key, {}).setdefault(match["tag"], {})[match["kind"]] = entry.path
+
+		for match, path in injection_dirs:
+			key = (match["method"], int(match["annuli"]), int(match["subsections"]))
+			fits_files = sorted(entry.path for entry in os.scandir(path) if entry.name.endswith(".fits"))
+			if fits_files:
+				self._injection_files.setdefault(key, {})[match["tag"]] = fits_files[0]
+
+	def keys(self):
+		'''Every (method, number of annuli, number of subsections) in the directory.'''
+		return list(self._files)
+
+	def tags(self, differential_imaging_method = "ADI+RDI", number_of_annuli = 1, number_of_subsections = 1):
+		'''The tags a combination was saved under, the part of its file names between NSUBS<n> and -KLmodes.'''
+		return list(self._files.get((differential_imaging_method, int(number_of_annuli), int(number_of_subsections)), {}))
+
+	def paths(self, differential_imaging_method = "ADI+RDI", number_of_annuli = 1, number_of_subsections = 1, tag = None, kinds = ()):
+		'''
+		The {"maskcons"/"cons"/"seps": path} of a combination saved under tag.
+		Without a tag, the one tag that has every file kind in kinds (e.g. ("maskcons", "seps")) is used, a ValueError is raised
+		when more than one does, so the tag has to be given.
+		'''
+		key = (differential_imaging_method, int(number_of_annuli), int(number_of_subsections))
+		return self._files[key][self._resolve_tag(key, tag, kinds)]
+
+	def _resolve_tag(self, key, tag, kinds):
+		if key not in self._files:
+			raise KeyError(f"No calcon files for {key} in {self.calcon_dir}")
+		tags = self._files[key]
+		if tag is None:
+			candidates = [candidate for candidate, paths in tags.items() if all(kind in paths for kind in kinds)]
+			if len(candidates) > 1:
+				raise ValueError(f"{key} was saved under more than one tag in {self.calcon_dir} ({candidates}), give the tag to use")
+			tag = candidates[0] if candidates else None
+		if tag not in tags or not all(kind in tags[tag] for kind in kinds):
+			raise KeyError(f"No {'/'.join(kinds) or 'calcon'} files for {key}{'' if tag is None else f' tagged {tag!r}'} in {self.calcon_dir}")
+		return tag
+
+	def injection_file(self, differential_imaging_method = "ADI+RDI", number_of_annuli = 1, number_of_subsections = 1, tag = None):
+		'''
+		The injection fits file of the set saved under tag (None when there is none). Without a tag, the one injection directory
+		of the combination, a ValueError is raised when it has more than one.
+		'''
+		key = (differential_imaging_method, int(number_of_annuli), int(number_of_subsections))
+		injection_files = self._injection_files.get(key, {})
+		if tag is not None:
+			return injection_files.get(tag)
+		if len(injection_files) > 1:
+			raise ValueError(f"{key} has injection files under more than one tag in {self.calcon_dir} ({list(injection_files)}), give the tag to use")
+		return next(iter(injection_files.values()), None)
+
+	def load(self, path):
+		'''Loads one of the indexed .npy files memory mapped (read only), each file is only opened once.'''
+		if path not in self._arrays:
+			self._arrays[path] = np.load(path, mmap_mode = 'r')
+			count("files_opened")
+		return self._arrays[path]
+
+	def contrast(self, differential_imaging_method = "ADI+RDI", number_of_annuli = 1, number_of_subsections = 1, include_transmistion_mask = True,
+				 tag = None):
+		'''The (read only, memory mapped) contrasts of a combination, see paths for tag.'''
+		kind = "maskcons" if include_transmistion_mask else "cons"
+		return self.load(self.paths(differential_imaging_method, number_of_annuli, number_of_subsections, tag, (kind,))[kind])
+
+	def separation_arcsec(self, differential_imaging_method = "ADI+RDI", number_of_annuli = 1, number_of_subsections = 1, tag = None):
+		'''The (read only, memory mapped) separations of a combination, see paths for tag.'''
+		return self.load(self.paths(differential_imaging_method, number_of_annuli, number_of_subsections, tag, ("seps",))["seps"])
+
+	def klmodes(self, differential_imaging_method = "ADI+RDI", number_of_annuli = 1, number_of_subsections = 1, tag = None):
+		'''The KL modes of a set, read from its injection file header on first use, see injection_file for tag.'''
+		injection_file = self.injection_file(differential_imaging_method, number_of_annuli, number_of_subsections, tag)
+		if injection_file is None:
+			key = (differential_imaging_method, int(number_of_annuli), int(number_of_subsections))
+			raise FileNotFoundError(f"No injection fits files for {key}{'' if tag is None else f' tagged {tag!r}'} in {self.calcon_dir}")
+		if injection_file not in self._klmodes:
+			self._klmodes[injection_file] = Read_KLmodes(injection_file, use_index = self.use_index)
+		return self._klmodes[injection_file]
+
+	def get(self, differential_imaging_method = "ADI+RDI", number_of_annuli = 1, number_of_subsections = 1, include_transmistion_mask = True,
+			tag = None):
+		'''The same (contrast, separation_arcsec, klmodes) as Get_Contrast_Separation_From_Calcon, all from one tag (see paths).'''
+		kind = "maskcons" if include_transmistion_mask else "cons"
+		key = (differential_imaging_method, int(number_of_annuli), int(number_of_subsections))
+		tag = self._resolve_tag(key, tag, (kind, "seps"))
+		paths = self._files[key][tag]
+		return self.load(paths[kind]), self.load(paths["seps"]), self.klmodes(*key, tag)
+
+	def sets(self, include_transmistion_mask = True):
+		'''
+		Every result set in the directory, one per tag, see Find_Calcon_Sets.
+		'''
+		contrast_kind = "maskcons" if include_transmistion_mask else "cons"
+		calcon_sets = []
+		for (method, annuli, subsections), tags in self._files.items():
+			for tag, paths in tags.items():
+				if contrast_kind not in paths or "seps" not in paths:
+					continue
+				calcon_sets.append({"differential_imaging_method": method,
+									"number_of_annuli": annuli,
+									"number_of_subsections": subsections,
+									"tag": tag,
+									"contrast_path": paths[contrast_kind],
+									"separation_arcsec_path": paths["seps"],
+									"injection_file": self.injection_file(method, annuli, subsections, tag)})
+		return calcon_sets
+
+
+def Find_Calcon_Sets(calcon_dir, include_transmistion_mask = True):
+	'''
+	Finds every calcon result set (method, number of annuli, number of subsections) in a directory.
+	Args:
+		calcon_dir (str/CalconIndex): The directory containing the calcon files, or an index of it.
+		include_transmistion_mask (bool): Use the transmission mask corrected contrasts (maskcons) rather than cons.
+	Returns:
+		list: One dict per set with the keys differential_imaging_method, number_of_annuli, number_of_subsections, tag
+			(see CalconIndex.paths), contrast_path, separation_arcsec_path and injection_file (None when the tag has none). Sets missing their contrasts or separations are left out.
+	'''
+	calcon_index = calcon_dir if isinstance(calcon_dir, CalconIndex) else CalconIndex(calcon_dir)
+	return calcon_index.sets(include_transmistion_mask = include_transmistion_mask)
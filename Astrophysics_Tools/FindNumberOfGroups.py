@@ -5,11 +5,128 @@ Matching the brightness/counts in the two images can be done as shown:
 '''
 from astropy.io import fits
 import numpy as np
+import logging
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
 
-def FindNumGroups(RefPath, SciPath, IsSciBrighter, KernelPix=15, Method="Summed", verbose=True, error_handling = None):
+from .Instrumentation import count, timer, timed, log
+
+@timed("FindNumberOfGroups.match_groups")
+def Match_Groups(RefCrops, SciCrop, Method="Summed"):
+    '''
+    Vectorised core of FindNumGroups, every group of the (brighter) reference ramp is compared to the science frame at once.
+
+    Inputs:
+        RefCrops (np.ndarray) : (groups, y, x) cropped reference ramp
+        SciCrop (np.ndarray) : (y, x) cropped final group of the science ramp
+        Method (Str) : {MaxPixel, Summed, Summed+Nan} see FindNumGroups
+
+    Returns:
+        minimizedGroups (int/None) : the matched group, None if no group matches
+        residual (float/None) : the summed flux left after subtracting the matched group from the science frame
+    '''
+    if "Nan" in Method:
+        SciCrop = np.where(SciCrop > np.max(SciCrop) // 2, SciCrop, np.nan)  # Get rid of data that isnt at least half the max pixel
+
+    if "Summed" in Method:
+        if "Nan" in Method:
+            RefMax = np.max(RefCrops, axis=(1, 2), keepdims=True)  # each group is cut at half of its own max pixel
+            RefCrops = np.where(RefCrops > RefMax // 2, RefCrops, np.nan)
+        summed = np.nansum(SciCrop - RefCrops, axis=(1, 2))  # total flux left in every group at once
+        candidates = np.where(summed > 0, summed, np.inf)  # making sure total flux is still above 0 (could have over subtraction issues still)
+        if not np.isfinite(candidates).any():
+            return None, None
+        minimizedGroups = int(np.argmin(candidates))  # argmin returns the first of equal minima, same as the < in a loop
+        return minimizedGroups, summed[minimizedGroups]
+    elif Method == "MaxPixel":
+        brighter = np.nanmax(SciCrop) < np.nanmax(RefCrops, axis=(1, 2))  # when any pixel's counts is larger than any pixels count
+        if not brighter.any():
+            return None, None
+        minimizedGroups = int(np.argmax(brighter))
+        return minimizedGroups, np.nansum(SciCrop - RefCrops[minimizedGroups])
+    return None, None
+
+
+def Load_Ramp_Crop(Path, Cx, Cy, KernelPix=15, integration=0, groups=slice(None), Load_Mode="Crop"):
+    '''
+    Loads the SCI ramp of a file cropped to a 2*KernelPix square around (Cx, Cy).
+
+    Inputs:
+        Path (Str) : the file path to the ramp
+        Cx, Cy (int) : centre pixel of the crop
+        KernelPix (int) : half the side length of the crop
+        integration (int) : which integration to read
+        groups (int/slice) : which group(s) to read
+        Load_Mode (Str) : {Crop, Full}
+            Crop : only the integration, groups and crop window asked for are read from disk (section access)
+            Full : the whole ramp is read into memory and then cropped (the original behaviour)
+
+    Returns:
+        (np.ndarray) : the cropped data, (groups, y, x) for a slice of groups, (y, x) for a single group
+    '''
+    window = (integration, groups, slice(Cy - KernelPix, Cy + KernelPix), slice(Cx - KernelPix, Cx + KernelPix))
+    with timer("FindNumberOfGroups.load_crop"), fits.open(Path) as hdul:
+        count("files_opened")
+        if Load_Mode == "Full":
+            data = hdul["SCI"].data  # type: ignore
+            count("bytes_read", data.nbytes)
+            return data[window]
+        crop = hdul["SCI"].section[window]  # type: ignore - section reads only the window, memory mapped when the data isnt scaled
+        count("bytes_read", crop.nbytes)
+        return crop
+
+
+def Iterate_Integration_Crops(Path, Cx, Cy, KernelPix=15, integrations=(0,), groups=slice(None), Load_Mode="Crop"):
+    '''
+    Streams the crops of several integrations of a ramp, opening the file once and reading one integration at a time.
+
+    Inputs:
+        Path, Cx, Cy, KernelPix, groups, Load_Mode : see Load_Ramp_Crop
+        integrations (iterable) : the integrations to read, in order
+
+    Yields:
+        (np.ndarray) : the crop of each integration in turn, (groups, y, x) for a slice of groups, (y, x) for a single group.
+            In Crop mode only that integration's window is read, so memory is bounded by a single crop whatever the number of integrations
+    '''
+    window = (groups, slice(Cy - KernelPix, Cy + KernelPix), slice(Cx - KernelPix, Cx + KernelPix))
+    with fits.open(Path) as hdul:
+        count("files_opened")
+        if Load_Mode == "Full":
+            source = hdul["SCI"].data  # type: ignore
+            count("bytes_read", source.nbytes)
+        else:
+            source = hdul["SCI"].section  # type: ignore
+        for integration in integrations:
+            with timer("FindNumberOfGroups.load_crop"):
+                crop = np.array(source[(integration,) + window])  # a copy, so nothing keeps the file (or the full ramp) alive
+            if Load_Mode != "Full":
+                count("bytes_read", crop.nbytes)
+            yield crop
+
+
+def _Load_SCI_Header(Path, cache):
+    if Path not in cache:
+        cache[Path] = fits.getheader(Path, extname="SCI")
+        count("files_opened")
+    return cache[Path]
+
+
+def _Load_Crop(Path, Cx, Cy, KernelPix, integration, groups, Load_Mode, cache):
+    '''groups is either a single group (int) or the (start, stop) of a range of groups, so it can be part of the cache key'''
+    key = (Path, Cx, Cy, KernelPix, integration, groups)
+    if key not in cache:
+        group_window = groups if isinstance(groups, int) else slice(*groups)
+        cache[key] = Load_Ramp_Crop(Path, Cx, Cy, KernelPix, integration, group_window, Load_Mode)
+    return cache[key]
+
+
+def FindNumGroups(RefPath, SciPath, IsSciBrighter, KernelPix=15, Method="Summed", verbose=True, error_handling = None,
+                  Load_Mode="Crop", memory_hook=None, Integrations=0, Stack=None):
     '''
     Inputs:
-        RefPath (Str) : the file path to A reference image.
+        RefPath (Str/list) : the file path to A reference image. A list of reference images returns a list with the groups for each of them.
         SciPath (Str) : The file path to th Science image.
         IsSciBrighter (Bool) : by default the Reference image is brighter (It was the first case I tested for, But the code works just as well if the image was the other way around. Since once the files are loaded in, its just variable names)
         KernelPix (int) : defines a 2*KernelPix+1 side length square around the centre pixel defined in the .fits image. 
@@ -17,25 +134,57 @@ def FindNumGroups(RefPath, SciPath, IsSciBrighter, KernelPix=15, Method="Summed"
             MaxPixel : Compares the two images to see when the max pixel has the same counts
             Summed : Sums all the values in the kernel, and matches this value
             Nan : an argument passed onto Summed (Summed+Nan) to ignore values below half the max pixel count (Used to better focus on the lobes of the Miri images.)
+        Load_Mode (Str) : {Crop, Full} Crop only reads the crop window of the integration used, Full reads the whole ramps (see Load_Ramp_Crop)
+        memory_hook (callable/None) : if given, called with {"peak_bytes", "loaded_bytes", "Load_Mode"} once the groups are found,
+            peak_bytes is the tracemalloc peak of the call, loaded_bytes the size of the cropped data kept in memory
+        Integrations (int/list/Str) : which integrations to use, integration i of the reference is matched with integration i of the science
+            int : a single integration (0, the first, by default)
+            list : these integrations, one result each
+            all : every integration both files have (the first min(NINTS) when the files have different numbers of integrations)
+            The integrations are streamed one at a time from a single open file (see Iterate_Integration_Crops)
+        Stack (Str/None) : {None, median, mean} match the median/mean of the integrations' crops instead, giving a single group
 
     Returns:
-        minimizedGroups (int) : the number of frame of the image cube which is nomininally brighter at the final frame. Can be used to slice the image with algorithms compatable, such as spaceKLIP
+        minimizedGroups (int/np.ma.MaskedArray/list) : the number of frame of the image cube which is nomininally brighter at the final frame. Can be used to slice the image with algorithms compatable, such as spaceKLIP
+            For a list of integrations (or all) without Stack, an array with the group of each integration, masked where no group matched
     '''
+    if Stack not in (None, "median", "mean"):
+        raise ValueError(f"Stack must be None, 'median' or 'mean', got {Stack!r}")
+    if memory_hook is not None:
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+
+    cache = {}  # each file is only read once, however many references are given
+    try:
+        if not isinstance(RefPath, str):
+            minimizedGroups = [_FindNumGroups(Ref, SciPath, IsSciBrighter, KernelPix, Method, verbose, Load_Mode, cache, Integrations, Stack)
+                               for Ref in RefPath]
+        else:
+            minimizedGroups = _FindNumGroups(RefPath, SciPath, IsSciBrighter, KernelPix, Method, verbose, Load_Mode, cache, Integrations, Stack)
+    finally:
+        # tracing left on would slow every later allocation in the process, so it is stopped even when the call fails
+        if memory_hook is not None:
+            _, peak_bytes = tracemalloc.get_traced_memory()
+            if not was_tracing:
+                tracemalloc.stop()
+
+    if memory_hook is not None:
+        loaded_bytes = sum(value.nbytes for value in cache.values() if isinstance(value, np.ndarray))
+        memory_hook({"peak_bytes": peak_bytes, "loaded_bytes": loaded_bytes, "Load_Mode": Load_Mode})
+    return minimizedGroups
+
+
+def _FindNumGroups(RefPath, SciPath, IsSciBrighter, KernelPix, Method, verbose, Load_Mode, cache, Integrations=0, Stack=None):
+    start = time.perf_counter()
     if IsSciBrighter:
         RefPath, SciPath = SciPath, RefPath  # Code assumes Reference images are brighter, so will cycle through those, but the science images
                                             # could be brighter, SpaceKLIP allows for the selection Sci or Ref images to be cropped in this way
                                             # so just swap around the Refpath and SciPath, and code works fine
 
-    with fits.open(RefPath) as hdul_Ref:
-        Reference_header = hdul_Ref["SCI"].header # type: ignore
-        Reference_data = hdul_Ref["SCI"].data   # type: ignore
-
-    with fits.open(SciPath) as hdul_Sci:
-        Science_header = hdul_Sci["SCI"].header # type: ignore
-        Science_data = hdul_Sci["SCI"].data   # type: ignore
-
-    integration_Ref = 0  # Just chose the first integration. THis could be changed?
-    integration_Sci = 0
+    Reference_header = _Load_SCI_Header(RefPath, cache)
+    Science_header = _Load_SCI_Header(SciPath, cache)
 
     group_Ref = int(Reference_header["NAXIS3"])  # How many total groups are there?
     group_Sci = int(Science_header["NAXIS3"])
@@ -43,33 +192,149 @@ def FindNumGroups(RefPath, SciPath, IsSciBrighter, KernelPix=15, Method="Summed"
     Cx = int(Reference_header["CRPIX1"])  # Centre pix location for image (centred on PSF not frame)
     Cy = int(Reference_header["CRPIX2"])
 
-    SciCube = Science_data[integration_Sci, group_Sci - 1]  # Load the Science Cube
+    if not isinstance(Integrations, (int, np.integer)) or Stack is not None:
+        return _FindNumGroups_Integrations(RefPath, SciPath, Reference_header, Science_header, Cx, Cy, KernelPix, Method, verbose,
+                                           Load_Mode, cache, Integrations, Stack, start)
 
-    SciCubeCrop = SciCube[(Cy - KernelPix):(Cy + KernelPix), (Cx - KernelPix):(Cx + KernelPix)]  # Crop it around the central PSF
-    if "Nan" in Method:
-        SciCubeCrop = np.where(SciCubeCrop > np.max(SciCubeCrop) // 2, SciCubeCrop, np.nan)  # Get rid of data that isnt at least half the max pixel
-                                                                                             # this is to isolate the PSF better?
-    Nminimized = np.inf  # Large number used for minimisation.
-    minimizedGroups = None
-    minimized = None
-
-    for i in range(group_Ref):
-        RefCube = Reference_data[integration_Ref, i]  # load cube
-        RefCubeCrop = RefCube[(Cy - KernelPix):(Cy + KernelPix), (Cx - KernelPix):(Cx + KernelPix)]  # crop it
-        if "Summed" in Method:
-            if "Nan" in Method:
-                RefCubeCrop = np.where(RefCubeCrop > np.max(RefCubeCrop) // 2, RefCubeCrop, np.nan)  # delete unrelated data
-            SubtractedCube = SciCubeCrop - RefCubeCrop  # take reference layer from Science layer
-            summed = np.nansum(SubtractedCube)  # add up total flux
-            if summed < Nminimized and summed > 0:  # minimize total flux. making sure total flux is still above 0 (could have over subtraction issues still)
-                Nminimized = summed
-                minimizedGroups = i
-                minimized = SubtractedCube
-        elif Method == "MaxPixel":
-            if np.nanmax(SciCubeCrop) < np.nanmax(RefCubeCrop):  # when any pixel's counts is larger than any pixels count, then return that image
-                if verbose:
-                    print(f"Optimized Groups using {Method} is: {i}")
-                return i
-    if verbose:
-        print(f"Optiimized Groups using {Method} is: {minimizedGroups}")
+    integration_Ref = int(Integrations)
+    integration_Sci = int(Integrations)
+
+    # Only the crop around the central PSF is read, the final Science group and every reference group
+    SciCubeCrop = _Load_Crop(SciPath, Cx, Cy, KernelPix, integration_Sci, group_Sci - 1, Load_Mode, cache)
+    RefCubeCrops = _Load_Crop(RefPath, Cx, Cy, KernelPix, integration_Ref, (0, group_Ref), Load_Mode, cache)
+
+    minimizedGroups, _ = Match_Groups(RefCubeCrops, SciCubeCrop, Method)
+    if Method == "MaxPixel" and minimizedGroups is not None:
+        log(f"Optimized Groups using {Method} is: {minimizedGroups}", verbose, start)
+    else:
+        log(f"Optiimized Groups using {Method} is: {minimizedGroups}", verbose, start)
     return minimizedGroups  # return frame that minimizes the total flux
+
+
+def _FindNumGroups_Integrations(RefPath, SciPath, Reference_header, Science_header, Cx, Cy, KernelPix, Method, verbose,
+                                Load_Mode, cache, Integrations, Stack, start):
+    group_Ref = int(Reference_header["NAXIS3"])
+    group_Sci = int(Science_header["NAXIS3"])
+    if isinstance(Integrations, str):
+        if Integrations != "all":
+            raise ValueError(f"Integrations must be an int, a list of ints or 'all', got {Integrations!r}")
+        Integrations = range(min(int(Reference_header.get("NAXIS4", 1)), int(Science_header.get("NAXIS4", 1))))
+    elif isinstance(Integrations, (int, np.integer)):
+        Integrations = [Integrations]
+    Integrations = [int(integration) for integration in Integrations]
+
+    # The science frames are one (y, x) crop per integration, small enough to read once and keep for every reference
+    key = (SciPath, Cx, Cy, KernelPix, tuple(Integrations), group_Sci - 1)
+    if key not in cache:
+        cache[key] = np.stack(list(Iterate_Integration_Crops(SciPath, Cx, Cy, KernelPix, Integrations, group_Sci - 1, Load_Mode)))
+    SciCrops = cache[key]
+    RefCrops = Iterate_Integration_Crops(RefPath, Cx, Cy, KernelPix, Integrations, slice(0, group_Ref), Load_Mode)
+
+    if Stack is not None:
+        if Stack == "mean":
+            # a running sum, only one integration of the reference is in memory at a time
+            RefStack = None
+            for RefCrop in RefCrops:
+                RefStack = RefCrop.astype(float) if RefStack is None else RefStack + RefCrop
+            RefStack = RefStack / len(Integrations)
+            SciStack = np.mean(SciCrops, axis=0)
+        else:
+            # the median needs every integration, but only the crops are held: integrations x groups x (2*KernelPix)^2
+            RefStack = np.median(np.stack(list(RefCrops)), axis=0)
+            SciStack = np.median(SciCrops, axis=0)
+        minimizedGroups, _ = Match_Groups(RefStack, SciStack, Method)
+        log(f"Optimized Groups using {Method} on the {Stack} of {len(Integrations)} integrations is: {minimizedGroups}", verbose, start)
+        return minimizedGroups
+
+    groups = np.full(len(Integrations), -1)
+    for i, RefCrop in enumerate(RefCrops):
+        minimizedGroups, _ = Match_Groups(RefCrop, SciCrops[i], Method)
+        if minimizedGroups is not None:
+            groups[i] = minimizedGroups
+    minimizedGroups = np.ma.masked_array(groups, mask=groups < 0)
+    log(f"Optimized Groups using {Method} per integration is: {minimizedGroups}", verbose, start)
+    return minimizedGroups
+
+
+def _Load_Crop_Task(task):
+    Path, Cx, Cy, KernelPix, integration, groups, Load_Mode = task
+    return _Load_Crop(Path, Cx, Cy, KernelPix, integration, groups, Load_Mode, {})
+
+
+def FindNumGroups_batch(Science, Reference=None, IsSciBrighter=False, KernelPix=15, Methods=("Summed",), max_workers=None,
+                        Load_Mode="Crop", progress=None, verbose=True):
+    '''
+    Runs FindNumGroups for every science x reference pairing, reading each file's cropped ramp only once.
+    The crops are read in parallel over a process pool, the group matching is then done on the cached crops.
+
+    Inputs:
+        Science (list/dict/FileTypeTable) : science file paths, or what File_Tools.Find_File_Types returns
+        Reference (list/None) : reference file paths, taken from Science["Reference"] when Science is a dictionary or table
+        IsSciBrighter (Bool) : see FindNumGroups, applied to every pairing
+        KernelPix (int) : see FindNumGroups
+        Methods (list) : the FindNumGroups methods to run on every pairing
+        max_workers (int/None) : number of processes reading the crops, 1 reads them in this process
+        Load_Mode (Str) : {Crop, Full} see Load_Ramp_Crop
+        progress (callable/None) : called with (number of crops read, total number of crops) as the crops are read
+        verbose (bool) : print the progress (logged instead once logging is set up, see Instrumentation)
+
+    Returns:
+        (astropy.table.Table) : columns sci, ref, method, best_group, residual_flux. One row per pairing and method, ordered by
+            sci, ref (both sorted) then method as given. best_group is masked where no group matched.
+    '''
+    from astropy import table  # only the batch builds a table, so FindNumGroups alone doesnt import astropy.table
+    if hasattr(Science, "to_dict"):  # a File_Tools.FileTypeTable
+        Science = Science.to_dict()
+    if isinstance(Science, dict):
+        Science, Reference = Science["Science"], Science["Reference"]
+    Science, Reference = sorted(Science), sorted(Reference)  # sorted so the table doesnt depend on directory listing order
+    pairs = list(product(Science, Reference))
+
+    headers = {}
+    for Path in Science + Reference:
+        _Load_SCI_Header(Path, headers)
+
+    # Work out every crop needed before reading any data, so each one is only read once
+    pair_crops = []
+    for SciPath, RefPath in pairs:
+        BrightPath, FaintPath = (SciPath, RefPath) if IsSciBrighter else (RefPath, SciPath)
+        Cx, Cy = int(headers[BrightPath]["CRPIX1"]), int(headers[BrightPath]["CRPIX2"])
+        bright_key = (BrightPath, Cx, Cy, KernelPix, 0, (0, int(headers[BrightPath]["NAXIS3"])), Load_Mode)
+        faint_key = (FaintPath, Cx, Cy, KernelPix, 0, int(headers[FaintPath]["NAXIS3"]) - 1, Load_Mode)
+        pair_crops.append((bright_key, faint_key))
+    tasks = list(dict.fromkeys(key for keys in pair_crops for key in keys))
+
+    start = time.perf_counter()
+    crops = {}
+    if max_workers == 1:
+        loaded = map(_Load_Crop_Task, tasks)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=max_workers)
+        loaded = executor.map(_Load_Crop_Task, tasks)
+    try:
+        for task, crop in zip(tasks, loaded):
+            crops[task] = crop
+            if progress is not None:
+                progress(len(crops), len(tasks))
+            # crops read in worker processes are not counted by the Instrumentation counters, only their total time here
+            log(f"Read {len(crops)}/{len(tasks)} crops", verbose, start,
+                level=logging.INFO if len(crops) == len(tasks) else logging.DEBUG)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    sci_column, ref_column, method_column, group_column, residual_column = [], [], [], [], []
+    for (SciPath, RefPath), (bright_key, faint_key) in zip(pairs, pair_crops):
+        for Method in Methods:
+            minimizedGroups, residual = Match_Groups(crops[bright_key], crops[faint_key], Method)
+            sci_column.append(SciPath)
+            ref_column.append(RefPath)
+            method_column.append(Method)
+            group_column.append(-1 if minimizedGroups is None else minimizedGroups)
+            residual_column.append(np.nan if residual is None else float(residual))
+
+    group_column = np.array(group_column, dtype=int)
+    return table.Table([sci_column, ref_column, method_column,
+                        table.MaskedColumn(group_column, mask=group_column < 0), np.array(residual_column, dtype=float)],
+                       names=["sci", "ref", "method", "best_group", "residual_flux"])
@@ -1,23 +1,76 @@
-from inspect import signature
+from inspect import signature, Parameter
 from functools import wraps
+import os
+
+# Type enforcement can be switched off for production runs, either with the environment variable
+# ASTROPHYSICS_TOOLS_ENFORCE_TYPES=0 (functions decorated afterwards are returned untouched, so there is no overhead at all)
+# or at run time with set_type_enforcement(False) (the wrappers then only check this flag)
+ENFORCE_TYPES = os.environ.get("ASTROPHYSICS_TOOLS_ENFORCE_TYPES", "1").lower() not in ("0", "false", "no", "off")
+
+def set_type_enforcement(enabled):
+    '''
+    Turns the checks of every enforce_types wrapper on or off at run time.
+    Args:
+        enabled (bool): Whether to check argument and return types.
+    '''
+    global ENFORCE_TYPES
+    ENFORCE_TYPES = bool(enabled)
 
 def enforce_types(func):
     '''
     Decorator to enforce PEP484 type annotations on function arguments and return values.
-    
+
     This decorator checks the types of the arguments passed to the function and the type of the return value against the annotations specified in the function's signature.
     If the types do not match, it raises a TypeError.
+    The checks are planned once, when the function is decorated, so ordinary calls skip binding the signature.
+    When ENFORCE_TYPES is off at decoration time the function is returned as it is.
     Args:
         func (callable): The function to be decorated.
                         (optional) PEP484 type annotations for its parameters and return value.
     '''
+    if not ENFORCE_TYPES:
+        return func
 
     # Get annotations and signature of the function
     sig = signature(func)
     PEP484_annotations = func.__annotations__
-    
-    @wraps(func)
-    def wrapper(*args, **kwargs):
+    expected_return_type = PEP484_annotations.get('return')
+
+    # Plan the checks: (position, name, expected type) of each annotated parameter, in signature order.
+    # Defaults never change, so whether a default passes its check is worked out here rather than on every call.
+    parameters = list(sig.parameters.values())
+    n_parameters = len(parameters)
+    is_simple_signature = all(parameter.kind in (Parameter.POSITIONAL_ONLY, Parameter.POSITIONAL_OR_KEYWORD) for parameter in parameters)
+    keyword_index = {parameter.name: index for index, parameter in enumerate(parameters) if parameter.kind == Parameter.POSITIONAL_OR_KEYWORD}
+    required = tuple((index, parameter.name) for index, parameter in enumerate(parameters) if parameter.default is Parameter.empty)
+    check_plan = tuple((index, parameter.name, PEP484_annotations[parameter.name])
+                       for index, parameter in enumerate(parameters) if PEP484_annotations.get(parameter.name))
+    def default_passes(default, expected_type):
+        # annotations isinstance can't take (e.g. list[int]) are left for the call, where the bind path would hit them too
+        try:
+            return isinstance(default, expected_type)
+        except TypeError:
+            return False
+
+    failing_defaults = {parameter.name: parameter.default for parameter in parameters
+                        if parameter.default is not Parameter.empty and PEP484_annotations.get(parameter.name)
+                        and not default_passes(parameter.default, PEP484_annotations[parameter.name])}
+
+    def is_fast_path_call(args, kwargs):
+        # a call that binds without any surprises: no extra arguments, keywords only for later parameters, nothing required missing
+        n_args = len(args)
+        if not is_simple_signature or n_args > n_parameters:
+            return False
+        for var_name in kwargs:
+            index = keyword_index.get(var_name)
+            if index is None or index < n_args:
+                return False
+        for index, var_name in required:
+            if index >= n_args and var_name not in kwargs:
+                return False
+        return True
+
+    def check_bound_arguments(args, kwargs):
         # gets the variable names and variable values from the function call
         bound_args = sig.bind(*args, **kwargs)
         bound_args.apply_defaults()
@@ -26,14 +79,35 @@ def enforce_types(func):
         for var_name, var_value in bound_args.arguments.items():
             expected_type = PEP484_annotations.get(var_name)
             if expected_type and not isinstance(var_value, expected_type):
-                raise TypeError(f"Argument '{var_name}' must be {expected_type}, got {var_value}")  
+                raise TypeError(f"Argument '{var_name}' must be {expected_type}, got {var_value}")
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not ENFORCE_TYPES:
+            return func(*args, **kwargs)
+
+        if is_fast_path_call(args, kwargs):
+            # fast path: check each planned argument where it was passed, by position or keyword, in signature order
+            n_args = len(args)
+            for index, var_name, expected_type in check_plan:
+                if index < n_args:
+                    var_value = args[index]
+                elif var_name in kwargs:
+                    var_value = kwargs[var_name]
+                elif var_name in failing_defaults:
+                    var_value = failing_defaults[var_name]
+                else:
+                    continue
+                if not isinstance(var_value, expected_type):
+                    raise TypeError(f"Argument '{var_name}' must be {expected_type}, got {var_value}")
         else:
-            returns = func(*args, **kwargs)
-        
+            check_bound_arguments(args, kwargs)
+
+        returns = func(*args, **kwargs)
+
         # Check return value against PEP484 annotations
-        expected_return_type = PEP484_annotations.get('return')
         if expected_return_type and not isinstance(returns, expected_return_type):
             raise TypeError(f"Return value must be {expected_return_type}, got {type(returns)}")
 
         return returns
-    return wrapper
\ No newline at end of file
+    return wrapper
@@ -0,0 +1,192 @@
+'''
+An opt-in sidecar index of fits primary headers for a directory.
+Each file's primary header keywords are stored in a small SQLite database next to the data, keyed on path+mtime+size,
+so repeated scans of the same directory only re-read the files that are new or have changed since the last scan.
+
+Usage:
+    with HeaderIndex("/path/to/uncal/") as index:
+        headers = index.headers()   # {path: {keyword: value}}
+        print(index.stats)
+
+From the command line:
+    python -m Astrophysics_Tools.Header_Index /path/to/uncal/ --verify
+    python -m Astrophysics_Tools.Header_Index /path/to/uncal/ --rebuild
+'''
+import argparse
+import glob
+import json
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from astropy.io import fits
+
+from .Instrumentation import count, timer, fits_header_bytes
+
+INDEX_FILE_NAME = ".header_index.sqlite"
+_SKIPPED_KEYWORDS = {"", "COMMENT", "HISTORY"}
+
+
+def _Read_Primary_Header(fits_file):
+    '''Reads the primary header of a fits file into a json-able dict.'''
+    with timer("Header_Index.read_header"):
+        header = fits.getheader(fits_file, ext=0)
+    count("files_opened")
+    count("bytes_read", fits_header_bytes(header))
+    keywords = {}
+    for key, value in header.items():
+        if key in _SKIPPED_KEYWORDS:
+            continue
+        if not isinstance(value, (bool, int, float, str)):
+            value = None  # fits.card.Undefined and similar
+        keywords[key] = value
+    return keywords
+
+
+def _File_Signature(fits_file):
+    stat = os.stat(fits_file)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class HeaderIndex:
+    '''
+    Inputs:
+        directory (str):          The directory of fits files to index.
+        index_path (str/None):    Where to keep the index, defaults to INDEX_FILE_NAME inside the directory.
+        pattern (str):            Glob pattern of the files to index.
+        max_workers (int/None):   Number of threads used to read headers that are not in the index.
+
+    Attributes:
+        stats (dict):             hits (read from the index), misses (read from the file) and removed (files no longer on disk).
+    '''
+    def __init__(self, directory, index_path=None, pattern="*.fits", max_workers=None):
+        self.directory = directory
+        self.index_path = index_path if index_path is not None else os.path.join(directory, INDEX_FILE_NAME)
+        self.pattern = pattern
+        self.max_workers = max_workers
+        self.stats = {"hits": 0, "misses": 0, "removed": 0}
+        self._connection = sqlite3.connect(self.index_path)
+        self._connection.execute("CREATE TABLE IF NOT EXISTS headers ("
+                                 "path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, header TEXT)")
+        self._connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._connection.close()
+
+    def files(self):
+        '''The files in the directory matching the index's pattern.'''
+        return glob.glob(os.path.join(self.directory, self.pattern))
+
+    def _stored(self):
+        rows = self._connection.execute("SELECT path, mtime_ns, size, header FROM headers")
+        return {path: (mtime_ns, size, header) for path, mtime_ns, size, header in rows}
+
+    def headers(self, fits_files=None):
+        '''
+        Returns the primary headers of the files, only reading files that are new or changed since they were indexed.
+
+        Inputs:
+            fits_files (list/None):   Files to return, defaults to every file matching the pattern.
+                                      When None, files that have disappeared from the directory are dropped from the index.
+
+        Returns:
+            (dict):                   {path: {keyword: value}} in the order of fits_files.
+        '''
+        scan_directory = fits_files is None
+        if scan_directory:
+            fits_files = self.files()
+
+        stored = self._stored()
+        headers = {}
+        stale = []
+        for fits_file in fits_files:
+            signature = _File_Signature(fits_file)
+            entry = stored.get(fits_file)
+            if entry is not None and entry[:2] == signature:
+                headers[fits_file] = json.loads(entry[2])
+                self.stats["hits"] += 1
+                count("header_index_hits")
+            else:
+                headers[fits_file] = None
+                stale.append((fits_file, signature))
+
+        if stale:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                read = list(executor.map(_Read_Primary_Header, [fits_file for fits_file, _ in stale]))
+            rows = []
+            for (fits_file, (mtime_ns, size)), header in zip(stale, read):
+                headers[fits_file] = header
+                rows.append((fits_file, mtime_ns, size, json.dumps(header)))
+            self._connection.executemany("INSERT OR REPLACE INTO headers VALUES (?, ?, ?, ?)", rows)
+            self.stats["misses"] += len(stale)
+            count("header_index_misses", len(stale))
+
+        if scan_directory:
+            removed = [(path,) for path in stored if path not in headers]
+            self._connection.executemany("DELETE FROM headers WHERE path = ?", removed)
+            self.stats["removed"] += len(removed)
+
+        self._connection.commit()
+        return headers
+
+    def get(self, fits_file):
+        '''Returns the primary header keywords of a single file, reading it only if it is not up to date in the index.'''
+        return self.headers([fits_file])[fits_file]
+
+    def rebuild(self):
+        '''Empties the index and re-reads every file in the directory.'''
+        self._connection.execute("DELETE FROM headers")
+        self._connection.commit()
+        return self.headers()
+
+    def verify(self):
+        '''
+        Checks the index against the directory without reading any headers.
+
+        Returns:
+            (dict):   "new" (not indexed), "changed" (mtime or size differ) and "missing" (indexed but no longer on disk) paths.
+        '''
+        stored = self._stored()
+        fits_files = self.files()
+        report = {"new": [], "changed": [], "missing": []}
+        for fits_file in fits_files:
+            entry = stored.get(fits_file)
+            if entry is None:
+                report["new"].append(fits_file)
+            elif entry[:2] != _File_Signature(fits_file):
+                report["changed"].append(fits_file)
+        on_disk = set(fits_files)
+        report["missing"] = [path for path in stored if path not in on_disk]
+        return report
+
+
+def _Main(argv=None):
+    parser = argparse.ArgumentParser(description="Build, rebuild or verify the fits header index of a directory.")
+    parser.add_argument("directory")
+    parser.add_argument("--index-path", default=None)
+    parser.add_argument("--pattern", default="*.fits")
+    parser.add_argument("--max-workers", type=int, default=None)
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument("--rebuild", action="store_true", help="Re-read every header")
+    action.add_argument("--verify", action="store_true", help="Report new/changed/missing files without reading them")
+    args = parser.parse_args(argv)
+
+    with HeaderIndex(args.directory, index_path=args.index_path, pattern=args.pattern, max_workers=args.max_workers) as index:
+        if args.verify:
+            for status, paths in index.verify().items():
+                print(f"{len(paths)} {status} files")
+                for path in paths:
+                    print(f"    {path}")
+        else:
+            headers = index.rebuild() if args.rebuild else index.headers()
+            print(f"Indexed {len(headers)} files: {index.stats}")
+
+
+if __name__ == "__main__":
+    _Main()
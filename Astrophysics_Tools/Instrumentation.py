@@ -0,0 +1,261 @@
+'''
+Counters and timers on the package's hot paths (fits files opened and bytes read, track parsing, group matching,
+interpolation calls, remote queries and cache hits), so a slow run can be pinned on I/O, parsing, computation or the network.
+
+Instrumentation is off by default, and then every hook is a single flag check. Turn it on around the code of interest:
+    from Astrophysics_Tools.Instrumentation import instrument
+    with instrument(profile=True, trace_memory=True) as report:
+        FindNumGroups(RefPath, SciPath, False)
+    print(report.to_json())
+    report.profile.sort_stats("cumulative").print_stats(10)
+or for the whole session with enable_instrumentation() (or ASTROPHYSICS_TOOLS_INSTRUMENT=1), reading the totals from
+get_metrics().snapshot().
+
+The verbose messages of the package are printed to stdout, as they always were, until logging is set up for them: once
+the application adds a handler (or calls enable_console_logging()) they go through the "Astrophysics_Tools" logger at
+INFO level instead. Warnings about the data (an unsupported mask, an age outside the models) are warnings.warn.
+'''
+import cProfile
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Iterator, Optional
+
+logger = logging.getLogger("Astrophysics_Tools")
+logger.addHandler(logging.NullHandler())
+_console_handler: Optional[logging.Handler] = None
+_level_before_console: Optional[int] = None
+
+_enabled = os.environ.get("ASTROPHYSICS_TOOLS_INSTRUMENT", "0").lower() not in ("", "0", "false", "no", "off")
+
+
+class Metrics:
+    # counters are plain totals, timers keep the number of calls, total and longest time in seconds
+    def __init__(self) -> None:
+        self.counters: dict[str, float] = {}
+        self.timers: dict[str, dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def count(self, name: str, n: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def add_time(self, name: str, seconds: float) -> None:
+        with self._lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                self.timers[name] = {"calls": 1, "total_s": seconds, "max_s": seconds}
+            else:
+                timer["calls"] += 1
+                timer["total_s"] += seconds
+                timer["max_s"] = max(timer["max_s"], seconds)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {"counters": dict(self.counters), "timers": {name: dict(timer) for name, timer in self.timers.items()}}
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.timers.clear()
+
+    def to_json(self, path: Optional[str] = None) -> str:
+        text = json.dumps(self.snapshot(), indent=2, sort_keys=True)
+        if path is not None:
+            with open(path, "w") as json_file:
+                json_file.write(text)
+        return text
+
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    return _metrics
+
+
+def enable_instrumentation() -> None:
+    global _enabled
+    _enabled = True
+
+
+def disable_instrumentation() -> None:
+    global _enabled
+    _enabled = False
+
+
+def is_instrumented() -> bool:
+    return _enabled
+
+
+def count(name: str, n: float = 1) -> None:
+    if _enabled:
+        _metrics.count(name, n)
+
+
+class _Timer:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        _metrics.add_time(self.name, time.perf_counter() - self.start)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name: str):
+    # with timer("MagToMass.parse_tracks"): ...  -- a shared do-nothing context manager when instrumentation is off
+    return _Timer(name) if _enabled else _NULL_TIMER
+
+
+def timed(name: str) -> Callable:
+    # decorator form of timer, for whole functions
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Timer(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def fits_header_bytes(header) -> int:
+    # a fits header is read in whole 2880 byte blocks of 36 cards, counting the END card
+    return 2880 * -(-(len(header) + 1) // 36)
+
+
+def enable_console_logging(level: int = logging.INFO, stream=None) -> logging.Handler:
+    # prints the package's messages (at level and above) to stdout, or stream, with nothing but the message
+    global _console_handler, _level_before_console
+    disable_console_logging()
+    _console_handler = logging.StreamHandler(sys.stdout if stream is None else stream)
+    _console_handler.setFormatter(logging.Formatter("%(message)s"))
+    _console_handler.setLevel(level)
+    logger.addHandler(_console_handler)
+    if logger.getEffectiveLevel() > level:
+        _level_before_console = logger.level
+        logger.setLevel(level)
+    return _console_handler
+
+
+def disable_console_logging() -> None:
+    # removes the handler and puts back the logger level enable_console_logging lowered
+    global _console_handler, _level_before_console
+    if _console_handler is not None:
+        logger.removeHandler(_console_handler)
+        _console_handler = None
+    if _level_before_console is not None:
+        logger.setLevel(_level_before_console)
+        _level_before_console = None
+
+
+def _logging_is_set_up() -> bool:
+    # whether a handler other than our NullHandler would see the package's records
+    current: Optional[logging.Logger] = logger
+    while current is not None:
+        if any(not isinstance(handler, logging.NullHandler) for handler in current.handlers):
+            return True
+        if not current.propagate:
+            return False
+        current = current.parent
+    return False
+
+
+def log(message: str, verbose: bool = True, start: Optional[float] = None, level: int = logging.INFO) -> None:
+    # the package's verbose output, with the time since start (a time.perf_counter()) appended when given.
+    # Printed (INFO and above) while nothing handles the logger, logged once the application has set logging up
+    if not verbose:
+        return
+    set_up = _logging_is_set_up()
+    if (set_up and not logger.isEnabledFor(level)) or (not set_up and level < logging.INFO):
+        return
+    if start is not None:
+        message = f"{message} ({time.perf_counter() - start:.3f} s)"
+    if set_up:
+        logger.log(level, message)
+    else:
+        print(message)
+
+
+class Report:
+    # what instrument() measured: metrics as a snapshot, profile a pstats.Stats, peak_bytes/top_allocations from tracemalloc
+    def __init__(self) -> None:
+        self.metrics: dict[str, Any] = {"counters": {}, "timers": {}}
+        self.wall_time_s: Optional[float] = None
+        self.profile: Optional[pstats.Stats] = None
+        self.peak_bytes: Optional[int] = None
+        self.top_allocations: list[str] = []
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"wall_time_s": self.wall_time_s, "peak_bytes": self.peak_bytes,
+                "top_allocations": self.top_allocations, **self.metrics}
+
+    def to_json(self, path: Optional[str] = None) -> str:
+        text = json.dumps(self.as_dict(), indent=2, sort_keys=True)
+        if path is not None:
+            with open(path, "w") as json_file:
+                json_file.write(text)
+        return text
+
+
+@contextmanager
+def instrument(profile: bool = False, trace_memory: bool = False, top_allocations: int = 10) -> Iterator[Report]:
+    # turns instrumentation on for the block (with fresh metrics), optionally under cProfile and tracemalloc
+    global _enabled
+    was_enabled = _enabled
+    report = Report()
+    _metrics.reset()
+    _enabled = True
+
+    was_tracing = tracemalloc.is_tracing()
+    if trace_memory:
+        if not was_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+    profiler = cProfile.Profile() if profile else None
+    start = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield report
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            report.profile = pstats.Stats(profiler)
+        report.wall_time_s = time.perf_counter() - start
+        if trace_memory:
+            report.peak_bytes = tracemalloc.get_traced_memory()[1]
+            snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, cProfile.__file__),
+                                                                  tracemalloc.Filter(False, tracemalloc.__file__)])
+            statistics = snapshot.statistics("lineno")[:top_allocations]
+            report.top_allocations = [str(statistic) for statistic in statistics]
+            if not was_tracing:
+                tracemalloc.stop()
+        report.metrics = _metrics.snapshot()
+        _enabled = was_enabled
@@ -1,10 +1,13 @@
 
 import glob
-import pandas as pd
-from scipy.interpolate import InterpolatedUnivariateSpline as IUS
 import numpy as np
-from astropy import constants as const
 import os
+import threading
+import warnings
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from .Instrumentation import count, timer, log
 
 def Load_Models(Instrument=None,Mask=None):
     '''
@@ -28,10 +31,10 @@ def Load_Models(Instrument=None,Mask=None):
         try:
             Mask.upper()
         except:
-            print("Type Error with Mask... Resetting")
+            warnings.warn("Type Error with Mask... Resetting",UserWarning,stacklevel=2)
             Mask=""
         if Mask.upper() not in ["MASK210R","MASK335R","MASK430R","MASKLWB","MASKSWB"]:
-            print("A not supported mask was entered, Assuming MASK335R")
+            warnings.warn("A not supported mask was entered, Assuming MASK335R",UserWarning,stacklevel=2)
             Mask = "MASK335R"
 
         FilePath=Main_File_Path+"JWST_coron_NIRCAM_"+Mask.upper()
@@ -40,11 +43,217 @@ def Load_Models(Instrument=None,Mask=None):
 
     return(FilePath)
 
-def Mag_to_Mass(Age_Estimate,MagToFind,Filter="NIRCAM-F444W",Instrument="NIRCAM",Mask="MASK335R",Verbose=True):
+BINARY_GRID_NAME = "ModelGrid.npz" # Written into a Load_Models directory by Convert_Models_To_Binary, used instead of the text tracks when present
+MODEL_GRID_CACHE_SIZE = 8 # The number of instrument/mask model grids kept in memory, least recently used are dropped first
+TRACK_QUANTITIES = ("TEFF","LUMINOSITY","RADIUS","GRAVITY") # The (upper case) track columns besides Mass and Age that are not magnitudes
+_Model_Grid_Cache = OrderedDict()
+_Model_Grid_Cache_Stats = {"hits": 0, "misses": 0, "evictions": 0}
+_Model_Grid_Cache_Lock = threading.Lock()
+_Mag_Mass_Tables_Cache = OrderedDict() # MagMassTables, also MODEL_GRID_CACHE_SIZE long and guarded by _Model_Grid_Cache_Lock
+_Cache_Loading = {} # key -> Future of the grid/tables a caller is building right now, guarded by _Model_Grid_Cache_Lock
+
+class ModelGrid:
+    '''
+    '   The tracks of one Load_Models directory parsed once into numpy arrays, tracks are padded with NaN to the longest track.
+    '   Zero magnitudes/ages (see RemoveZerosFromConnectedList) are stored as NaN.
+    '
+    '   Attributes:
+    '       FilePath (str):             The Load_Models directory the tracks were read from
+    '       Files (list):               The track files, in the order they were read
+    '       Filters (list):             The (upper case) columns other than Mass and Age, the last axis of Magnitudes.
+    '                                   These are the filters, along with any other tabulated quantities (e.g. Teff)
+    '       Magnitude_Filters (list):   The Filters that are magnitudes, those not in TRACK_QUANTITIES
+    '       Mass (np.ndarray):          (mass,) The mass of each track in solar masses
+    '       Age (np.ndarray):           (mass, age) The tabulated ages of each track in Gyr
+    '       Magnitudes (np.ndarray):    (mass, age, filter) The tabulated absolute magnitudes
+    '       Age_Limits (np.ndarray):    (mass, 2) The first and last tabulated age of each track, before removing zeros
+    '''
+    def __init__(self, FilePath, Files, Filters, Mass, Age, Magnitudes, Age_Limits):
+        self.FilePath = FilePath
+        self.Files = list(Files)
+        self.Filters = [Filter.upper() for Filter in Filters]
+        self.Magnitude_Filters = [Filter for Filter in self.Filters if Filter not in TRACK_QUANTITIES]
+        self.Mass = Mass
+        self.Age = Age
+        self.Magnitudes = Magnitudes
+        self.Age_Limits = Age_Limits
+
+    @classmethod
+    def From_Directory(cls, FilePath):
+        '''
+        '   Parses every track in a Load_Models directory, this is the only place the text files are read
+        '''
+        import pandas as pd # pandas and scipy are imported on first use, so importing the package stays quick
+        Files = glob.glob(FilePath+"/*.txt")
+        with timer("MagToMass.parse_tracks"):
+            Tracks = [ReshapeData(pd.read_csv(f,header=0,sep=r"\s+")) for f in Files]
+        count("files_opened",len(Files))
+        count("bytes_read",sum(os.path.getsize(f) for f in Files))
+        if not Tracks:
+            raise FileNotFoundError(f"No model tracks found in {FilePath}")
+        Filters = [key for key in Tracks[0].keys() if key not in ("Mass","Age")]
+        n_age = max(len(df) for df in Tracks)
+
+        Mass = np.array([float(df["Mass"][0]) for df in Tracks])
+        Age = np.full((len(Tracks),n_age),np.nan)
+        Magnitudes = np.full((len(Tracks),n_age,len(Filters)),np.nan)
+        Age_Limits = np.empty((len(Tracks),2))
+        for i,df in enumerate(Tracks):
+            Ages = np.array(df["Age"],dtype=float)
+            Mags = np.array(df[Filters],dtype=float)
+            Age_Limits[i] = Ages[0],Ages[-1]
+            Mags[Mags == 0] = np.nan # Some filters in have tabiulated magnitudes that are 0 for the wrong reasons
+            Mags[Ages == 0] = np.nan
+            Ages[Ages == 0] = np.nan
+            Age[i,:len(df)] = Ages
+            Magnitudes[i,:len(df)] = Mags
+        return cls(FilePath,Files,Filters,Mass,Age,Magnitudes,Age_Limits)
+
+    @classmethod
+    def From_Binary(cls, BinaryPath):
+        '''
+        '   Loads a grid saved by ModelGrid.Save/Convert_Models_To_Binary
+        '''
+        count("files_opened")
+        count("bytes_read",os.path.getsize(BinaryPath))
+        with timer("MagToMass.load_binary_grid"), np.load(BinaryPath) as Data:
+            return cls(str(Data["FilePath"]),Data["Files"].tolist(),Data["Filters"].tolist(),
+                       Data["Mass"],Data["Age"],Data["Magnitudes"],Data["Age_Limits"])
+
+    @classmethod
+    def Load(cls, FilePath):
+        '''
+        '   Loads the grid of a Load_Models directory, from its BINARY_GRID_NAME file if it has been converted, otherwise from the text tracks
+        '''
+        BinaryPath = os.path.join(FilePath,BINARY_GRID_NAME)
+        if os.path.exists(BinaryPath):
+            return cls.From_Binary(BinaryPath)
+        return cls.From_Directory(FilePath)
+
+    def Save(self, BinaryPath):
+        '''
+        '   Saves the grid as a single uncompressed .npz file
+        '''
+        with open(BinaryPath,"wb") as f: # a file object, so numpy doesnt append .npz to the name
+            np.savez(f,FilePath=self.FilePath,Files=np.array(self.Files,dtype=str),Filters=np.array(self.Filters,dtype=str),
+                     Mass=self.Mass,Age=self.Age,Magnitudes=self.Magnitudes,Age_Limits=self.Age_Limits)
+
+    def Filter_Index(self,Filter):
+        try:
+            return self.Filters.index(Filter.upper())
+        except ValueError:
+            raise KeyError(f"{Filter} is not one of the model filters: {self.Filters}") from None
+
+    def Track(self,i,Filter):
+        '''
+        '   Returns:
+        '       (Ages, Mags) (np.ndarray): The i-th track in the given filter, with the zero magnitudes/ages removed
+        '''
+        Ages = self.Age[i]
+        Mags = self.Magnitudes[i,:,self.Filter_Index(Filter)]
+        keep = ~np.isnan(Ages) & ~np.isnan(Mags)
+        return Ages[keep],Mags[keep]
+
+
+def Load_Model_Grid(Instrument=None,Mask=None):
+    '''
+    '   Returns the ModelGrid for an instrument/mask, parsing the tracks on first use and then keeping it in a least recently used cache
+    '   of MODEL_GRID_CACHE_SIZE grids. The cache is keyed on the directory Load_Models resolves the (Instrument, Mask) to.
+    '
+    '   Returns:
+    '       (ModelGrid/None): None when the instrument has no models
+    '''
+    FilePath = Load_Models(Instrument,Mask)
+    if FilePath == None:
+        return None
+    return _Load_Once(_Model_Grid_Cache,FilePath,lambda: ModelGrid.Load(FilePath),Stats=_Model_Grid_Cache_Stats)
+
+def _Load_Once(Cache,key,Build,Stats=None):
+    '''
+    '   Returns Cache[key], calling Build() on a miss. Build runs outside the lock, so other keys can still be looked up meanwhile,
+    '   but only the first caller of a key builds it: the others wait on its Future and share the result (or the exception).
+    '   With Stats, a caller that waited counts as a hit, so misses is the number of times the tracks were parsed.
+    '''
+    with _Model_Grid_Cache_Lock:
+        Cached = key in Cache
+        if Cached:
+            Cache.move_to_end(key)
+        else:
+            Loading = _Cache_Loading.get(key)
+            Building = Loading is None
+            if Building:
+                Loading = _Cache_Loading[key] = Future()
+        if Stats is not None:
+            Outcome = "misses" if not Cached and Building else "hits"
+            Stats[Outcome] += 1
+            count(f"model_grid_cache_{Outcome}")
+        if Cached:
+            return Cache[key]
+    if not Building:
+        return Loading.result()
+    try:
+        Value = Build()
+    except BaseException as error:
+        with _Model_Grid_Cache_Lock:
+            del _Cache_Loading[key]
+        Loading.set_exception(error)
+        raise
+    with _Model_Grid_Cache_Lock:
+        del _Cache_Loading[key]
+        Cache[key] = Value
+        while len(Cache) > max(MODEL_GRID_CACHE_SIZE,1):
+            Cache.popitem(last=False)
+            if Stats is not None:
+                Stats["evictions"] += 1
+    Loading.set_result(Value)
+    return Value
+
+def Convert_Models_To_Binary(Instrument=None,Mask=None,Output=None,Overwrite=False):
+    '''
+    '   One-time conversion of a Load_Models directory of text tracks into a single binary file (see ModelGrid.Save),
+    '   with the "#" header repair and zero magnitude cleanup already applied. Load_Model_Grid uses it automatically once
+    '   it is inside the models directory. The binary file is not checked against the text tracks, rerun with Overwrite=True
+    '   if the tracks change.
+    '
+    '   Inputs:
+    '       Instrument (str), Mask (str):   As Load_Models
+    '       Output (str/None):              Where to write the file, defaults to BINARY_GRID_NAME inside the models directory
+    '       Overwrite (bool):               Replace an existing binary file
+    '
+    '   Returns:
+    '       (str/None):                     The path written to, None when the instrument has no models
+    '''
+    FilePath = Load_Models(Instrument,Mask)
+    if FilePath == None:
+        return None
+    if Output is None:
+        Output = os.path.join(FilePath,BINARY_GRID_NAME)
+    if os.path.exists(Output) and not Overwrite:
+        raise FileExistsError(f"{Output} already exists, use Overwrite=True to replace it")
+    ModelGrid.From_Directory(FilePath).Save(Output)
+    return Output
+
+def Model_Grid_Cache_Info():
+    '''
+    '   Returns:
+    '       (dict): hits, misses, evictions, the current size and the cached directories of the model grid cache
+    '''
+    with _Model_Grid_Cache_Lock:
+        return {**_Model_Grid_Cache_Stats, "size": len(_Model_Grid_Cache), "maxsize": MODEL_GRID_CACHE_SIZE, "FilePaths": list(_Model_Grid_Cache)}
+
+def Clear_Model_Grid_Cache():
+    with _Model_Grid_Cache_Lock:
+        _Model_Grid_Cache.clear()
+        _Mag_Mass_Tables_Cache.clear()
+        for key in _Model_Grid_Cache_Stats:
+            _Model_Grid_Cache_Stats[key] = 0
+
+def Mag_to_Mass(Age_Estimate,MagToFind,Filter="NIRCAM-F444W",Instrument="NIRCAM",Mask="MASK335R",Verbose=True,Exact=False):
     
     '''
     '    Mag to Mass is the main body of this code, taking inputs and controls the rest of the functions.
     '    The user may suggest an age to fit the models to, and an absolute magnitude to find the best mass for
+    '    The models are read once per instrument/mask (see Load_Model_Grid), later calls do no file I/O.
     '
     '    Inputs:
     '        Age_Estimate (float):    Estimate of the age of the system you are fitting an evolutionary model to
@@ -53,41 +262,285 @@ def Mag_to_Mass(Age_Estimate,MagToFind,Filter="NIRCAM-F444W",Instrument="NIRCAM"
     '        Instrument (str/None):   Used for file handling
     '        Mask (str/None):         Mask used for the observation if any
     '        Verbose (bool):          Errors could occour with finding tabulated ages, when True, this will output the
-    '                                 the number of files skipped for this reason
+    '                                 the number of files skipped for this reason (logged instead once logging is set up)
+    '        Exact (bool):            Evaluate the splines exactly with Evaluate_Spline rather than InterpolateTheData's
+    '                                 nearest linspace point. Magnitudes outside the models then give NaN rather than the edge
     '
     '    Returns:
     '        (float):                 In Jupiter masses, the mass of the object with sepeficied absolute magnitude, at
     '                                 the specified age
     '''
 
+    from astropy import constants as const
+    Interpolate = Evaluate_Spline if Exact else InterpolateTheData
     skipped=0
-    FilePath = Load_Models(Instrument,Mask)
-    if FilePath == None:
+    Grid = Load_Model_Grid(Instrument,Mask)
+    if Grid == None:
         return("No file Path")
         
     Age_Estimate/=1000 # conversion to Units of GYR from MYR input
     MagMassForAge=[]
-    for f in glob.glob(FilePath+"/*.txt"):
-        Data=pd.read_csv(f,header=0,delim_whitespace=True)
-        df=ReshapeData(Data)
-        if Age_Estimate < float(df["Age"][0]) or Age_Estimate > float(df["Age"][len(df["Age"])-1]):
-            print("Age is outside of the model's range")
+    for i in range(len(Grid.Mass)):
+        if Age_Estimate < Grid.Age_Limits[i,0] or Age_Estimate > Grid.Age_Limits[i,1]:
+            warnings.warn("Age is outside of the model's range",UserWarning,stacklevel=2)
             break
-        df_closest = df.iloc[(df['Age'].astype(float)-Age_Estimate).abs().argsort()[:2]]
         
-        Mag_in_Filter=df[Filter.upper()].astype(float).tolist()
-        Ages=df["Age"].astype(float).tolist()
-        Ages,Mag_in_Filter=RemoveZerosFromConnectedList(Ages,Mag_in_Filter)
+        Ages,Mag_in_Filter=Grid.Track(i,Filter)
         
         if Age_Estimate < min(Ages) or Age_Estimate > max(Ages):
             skipped+=1
         else:
-            MagMassForAge+=[(InterpolateTheData(Age_Estimate,Ages,Mag_in_Filter),float(df["Mass"][0]))]
+            MagMassForAge+=[(Interpolate(Age_Estimate,Ages,Mag_in_Filter),float(Grid.Mass[i]))]
     
     Mag,Mass=zip(*sorted(MagMassForAge)) #The data needs to be sorted to be interpolated
-    if Verbose:
-        print(f"{skipped} Files were skipped during the interpolation since the tabulated data did not contain the age ({Age_Estimate} Gyr) Specifed")
-    return InterpolateTheData(MagToFind,Mag,Mass)*const.M_sun/const.M_jup
+    log(f"{skipped} Files were skipped during the interpolation since the tabulated data did not contain the age ({Age_Estimate} Gyr) Specifed",Verbose)
+    return Interpolate(MagToFind,Mag,Mass)*const.M_sun/const.M_jup
+
+def _No_Models_Error(Instrument,Mask):
+    return FileNotFoundError(f"No models for Instrument={Instrument!r}, Mask={Mask!r}, Load_Models only knows MIRI, NIRISS and NIRCAM")
+
+def Mag_to_Mass_Array(Age_Estimate,MagToFind,Filter="NIRCAM-F444W",Instrument="NIRCAM",Mask="MASK335R",Verbose=True,order=3):
+    '''
+    '    Array version of Mag_to_Mass, ages and magnitudes are broadcast against each other (e.g. a contrast curve of shape
+    '    (KL modes, separations) with a single age, or a grid of ages against a column of magnitudes).
+    '    The mag-mass relation is built once for each distinct age, and then every magnitude at that age is found with one
+    '    spline evaluation. Tracks that do not cover an age are left out of that age's relation.
+    '
+    '    Inputs:
+    '        Age_Estimate (float/array):  Estimate(s) of the age of the system in Myr
+    '        MagToFind (float/array):     The absolute magnitude(s) to be converted to mass
+    '        Filter, Instrument, Mask:    As Mag_to_Mass
+    '        Verbose (bool):              Print the number of ages that no tracks (or too few to interpolate) cover
+    '                                     (logged instead once logging is set up)
+    '        order (int, {1,2,3}):        The order of the splines, see Evaluate_Spline
+    '
+    '    Returns:
+    '        (np.ndarray):                In Jupiter masses, broadcast shape of the inputs. NaN where the magnitude or age is
+    '                                     outside of the models' range
+    '
+    '    Raises:
+    '        FileNotFoundError:           When there are no models for the instrument (unlike Mag_to_Mass, which returns "No file Path")
+    '''
+    from astropy import constants as const
+    Grid = Load_Model_Grid(Instrument,Mask)
+    if Grid == None:
+        raise _No_Models_Error(Instrument,Mask)
+
+    Ages_Gyr,Mags = np.broadcast_arrays(np.asarray(Age_Estimate,dtype=float)/1000,np.asarray(MagToFind,dtype=float)) # conversion to Units of GYR from MYR input
+    Unique_Ages,Age_Index = np.unique(Ages_Gyr,return_inverse=True)
+    Age_Index = Age_Index.reshape(Ages_Gyr.shape)
+
+    # Each track's magnitude at every requested age, one spline per track
+    Track_Mags = np.full((len(Grid.Mass),len(Unique_Ages)),np.nan)
+    for i in range(len(Grid.Mass)):
+        Ages,Mag_in_Filter = Grid.Track(i,Filter)
+        if len(Ages) <= order:
+            continue
+        Track_Mags[i] = Evaluate_Spline(Unique_Ages,Ages,Mag_in_Filter,order)
+
+    Masses = np.full(Ages_Gyr.shape,np.nan)
+    skipped = 0
+    for j in range(len(Unique_Ages)):
+        valid = ~np.isnan(Track_Mags[:,j])
+        Mag,first = np.unique(Track_Mags[valid,j],return_index=True) #The data needs to be sorted to be interpolated
+        if len(Mag) <= order:
+            skipped += 1
+            continue
+        at_age = Age_Index == j
+        Masses[at_age] = Evaluate_Spline(Mags[at_age],Mag,Grid.Mass[valid][first],order)
+    if skipped:
+        log(f"{skipped} of {len(Unique_Ages)} ages are not covered by enough of the tabulated tracks, their masses are NaN",Verbose)
+    return Masses*(const.M_sun/const.M_jup).decompose().value
+
+class MagMassTables:
+    '''
+    '   Magnitude <-> mass lookup tables of a ModelGrid, precomputed once on a grid of ages for any number of filters.
+    '   At every grid age each filter's mag-mass relation is splined across the tracks and tabulated on a fine, uniform grid of
+    '   log mass, so a lookup in either direction is a np.interp (O(log n)) rather than new splines. Ages between grid ages are
+    '   interpolated linearly in log age between the two neighbouring tables.
+    '
+    '   Inputs:
+    '       Grid (ModelGrid):               The parsed tracks, see Load_Model_Grid
+    '       Age_Grid (array/None):          The ages (Myr) to tabulate, defaults to 100 log spaced ages over the models' age range.
+    '                                       Lookups outside of Age_Grid are NaN
+    '       Filters (list/None):            The filters (columns of Grid.Filters) to tabulate, defaults to Grid.Magnitude_Filters
+    '       order (int, {1,2,3}):           The order of the splines, see Evaluate_Spline
+    '       Mass_Steps (int):               The number of log mass points in each table
+    '
+    '   Attributes:
+    '       Ages (np.ndarray):              (age,) The grid ages in Myr
+    '       Filters (list):                 The tabulated filters, the last axis of Magnitudes
+    '       Mass (np.ndarray):              (Mass_Steps,) The tabulated masses in Jupiter masses
+    '       Magnitudes (np.ndarray):        (age, Mass_Steps, filter) The magnitudes, NaN outside the masses the tracks cover at that age
+    '       Invertible (np.ndarray):        (age, filter) Whether the magnitudes are strictly monotonic in mass, Mag_to_Mass is NaN where not
+    '''
+    def __init__(self, Grid, Age_Grid=None, Filters=None, order=3, Mass_Steps=1000):
+        from astropy import constants as const
+        Filters = list(Grid.Magnitude_Filters) if Filters is None else [Filter.upper() for Filter in Filters]
+        for Filter in Filters:
+            Grid.Filter_Index(Filter) # KeyError for filters the models dont have
+        if Age_Grid is None:
+            Age_Grid = np.geomspace(np.nanmin(Grid.Age)*1000,np.nanmax(Grid.Age)*1000,100)
+        self.Ages = np.unique(np.asarray(Age_Grid,dtype=float))
+        self.Filters = Filters
+        Mass_To_Mjup = (const.M_sun/const.M_jup).decompose().value
+        Log_Mass_Tracks = np.log10(Grid.Mass*Mass_To_Mjup)
+        self._Log_Mass = np.linspace(Log_Mass_Tracks.min(),Log_Mass_Tracks.max(),Mass_Steps)
+        self.Mass = 10**self._Log_Mass
+        self._Log_Ages = np.log10(self.Ages)
+
+        with timer("MagToMass.mag_mass_tables"):
+            # every track's magnitude at every grid age, one spline per track and filter
+            Track_Mags = np.full((len(self.Ages),len(Grid.Mass),len(Filters)),np.nan)
+            for i in range(len(Grid.Mass)):
+                for k,Filter in enumerate(Filters):
+                    Ages,Mag_in_Filter = Grid.Track(i,Filter)
+                    if len(Ages) > order:
+                        Track_Mags[:,i,k] = Evaluate_Spline(self.Ages/1000,Ages,Mag_in_Filter,order)
+
+            self.Magnitudes = np.full((len(self.Ages),Mass_Steps,len(Filters)),np.nan)
+            self.Invertible = np.zeros((len(self.Ages),len(Filters)),dtype=bool)
+            for j in range(len(self.Ages)):
+                for k in range(len(Filters)):
+                    valid = ~np.isnan(Track_Mags[j,:,k])
+                    if valid.sum() <= order:
+                        continue
+                    Mags = Evaluate_Spline(self._Log_Mass,Log_Mass_Tracks[valid],Track_Mags[j,valid,k],order)
+                    if not _Strictly_Monotonic(Mags):
+                        # a cubic can wiggle between tracks, the straight lines between them cant if the tracks themselves are monotonic
+                        sort = np.argsort(Log_Mass_Tracks[valid])
+                        in_range = ~np.isnan(Mags)
+                        Mags[in_range] = np.interp(self._Log_Mass[in_range],Log_Mass_Tracks[valid][sort],Track_Mags[j,valid,k][sort])
+                    self.Magnitudes[j,:,k] = Mags
+                    self.Invertible[j,k] = _Strictly_Monotonic(Mags)
+        count("interpolation_calls",len(Grid.Mass)*len(Filters)+len(self.Ages)*len(Filters))
+
+    def _Age_Slices(self,Age_Estimate):
+        # the two neighbouring grid ages of each age, and the weight of the upper one (NaN outside the grid)
+        Log_Age = np.log10(np.asarray(Age_Estimate,dtype=float))
+        upper = np.clip(np.searchsorted(self._Log_Ages,Log_Age),1,max(len(self.Ages)-1,1))
+        lower = upper-1
+        if len(self.Ages) == 1:
+            weight = np.where(Log_Age == self._Log_Ages[0],0.0,np.nan)
+            return np.zeros_like(upper),np.zeros_like(upper),weight
+        weight = (Log_Age-self._Log_Ages[lower])/(self._Log_Ages[upper]-self._Log_Ages[lower])
+        weight = np.where((weight >= 0) & (weight <= 1),weight,np.nan)
+        return lower,upper,weight
+
+    def _Lookup(self,Age_Estimate,Values,k,Inverse):
+        lower,upper,weight = self._Age_Slices(Age_Estimate)
+        Shape = np.broadcast_shapes(np.shape(Age_Estimate),np.shape(Values))
+        Values,lower,upper,weight = (np.broadcast_to(Array,Shape).ravel() for Array in (np.asarray(Values,dtype=float),lower,upper,weight))
+        Found = np.full((2,len(Values)),np.nan)
+        for side,slices in enumerate((lower,upper)):
+            for j in np.unique(slices):
+                at_slice = slices == j
+                Mags = self.Magnitudes[j,:,k]
+                valid = ~np.isnan(Mags)
+                if not valid.any() or (Inverse and not self.Invertible[j,k]):
+                    continue
+                if Inverse:
+                    Mags,Log_Mass = Mags[valid],self._Log_Mass[valid]
+                    if Mags[0] > Mags[-1]: # brighter (smaller magnitudes) with mass, np.interp needs increasing x
+                        Mags,Log_Mass = Mags[::-1],Log_Mass[::-1]
+                    Found[side][at_slice] = np.interp(Values[at_slice],Mags,Log_Mass,left=np.nan,right=np.nan)
+                else:
+                    Found[side][at_slice] = np.interp(np.log10(Values[at_slice]),self._Log_Mass[valid],Mags[valid],left=np.nan,right=np.nan)
+        # on a grid age only that table is used, so a NaN in the unused neighbour doesnt spread
+        Result = np.where(weight == 0,Found[0],np.where(weight == 1,Found[1],(1-weight)*Found[0]+weight*Found[1]))
+        Result = np.where(np.isnan(weight),np.nan,Result).reshape(Shape)
+        Result = 10**Result if Inverse else Result
+        return Result if Result.ndim else float(Result)
+
+    def _Per_Filter(self,Age_Estimate,Values,Filter,Inverse):
+        if Filter is None or not isinstance(Filter,str):
+            Filters = self.Filters if Filter is None else [F.upper() for F in Filter]
+            Values = np.asarray(Values,dtype=float)
+            if Inverse:
+                # a magnitude per filter along the last axis
+                if Values.shape[-1:] != (len(Filters),):
+                    raise ValueError(f"The last axis of the magnitudes must have one value per filter ({len(Filters)})")
+                return np.stack([self._Lookup(Age_Estimate,Values[...,i],self.Filters.index(F),Inverse) for i,F in enumerate(Filters)],axis=-1)
+            return np.stack([self._Lookup(Age_Estimate,Values,self.Filters.index(F),Inverse) for F in Filters],axis=-1)
+        if Filter.upper() not in self.Filters:
+            raise KeyError(f"{Filter} is not one of the tabulated filters: {self.Filters}")
+        return self._Lookup(Age_Estimate,Values,self.Filters.index(Filter.upper()),Inverse)
+
+    def Mass_to_Mag(self,Age_Estimate,Mass,Filter=None):
+        '''
+        '   Inputs:
+        '       Age_Estimate (float/array): Age(s) in Myr
+        '       Mass (float/array):         Mass(es) in Jupiter masses, broadcast against the ages
+        '       Filter (str/list/None):     A filter, or a list of them (None for every tabulated filter)
+        '
+        '   Returns:
+        '       (np.ndarray): The absolute magnitudes, with a last axis of one magnitude per filter when Filter is a list/None.
+        '                     NaN outside of the age grid and the masses covered by the tracks
+        '''
+        return self._Per_Filter(Age_Estimate,Mass,Filter,Inverse=False)
+
+    def Mag_to_Mass(self,Age_Estimate,MagToFind,Filter="NIRCAM-F444W"):
+        '''
+        '   Inputs:
+        '       Age_Estimate (float/array): Age(s) in Myr
+        '       MagToFind (float/array):    Absolute magnitude(s), broadcast against the ages. With a list of filters (or None),
+        '                                   the last axis holds the magnitude in each filter
+        '       Filter (str/list/None):     A filter, or a list of them (None for every tabulated filter)
+        '
+        '   Returns:
+        '       (np.ndarray): The masses in Jupiter masses, NaN outside of the age grid and the models' magnitudes
+        '''
+        return self._Per_Filter(Age_Estimate,MagToFind,Filter,Inverse=True)
+
+
+def _Strictly_Monotonic(Values):
+    Steps = np.diff(Values[~np.isnan(Values)])
+    return len(Steps) > 0 and (np.all(Steps > 0) or np.all(Steps < 0))
+
+def Load_Mag_Mass_Tables(Instrument="NIRCAM",Mask="MASK335R",Age_Grid=None,Filters=None,order=3,Mass_Steps=1000):
+    '''
+    '   Returns the MagMassTables of an instrument/mask, built on first use and then cached (MODEL_GRID_CACHE_SIZE of them, cleared
+    '   with the model grids by Clear_Model_Grid_Cache). The cache is keyed on the models directory and every other argument.
+    '
+    '   Inputs:
+    '       Instrument (str), Mask (str):   As Load_Models
+    '       Age_Grid, Filters, order, Mass_Steps: As MagMassTables
+    '
+    '   Returns:
+    '       (MagMassTables/None): None when the instrument has no models
+    '''
+    Grid = Load_Model_Grid(Instrument,Mask)
+    if Grid == None:
+        return None
+    key = (Grid.FilePath,None if Age_Grid is None else tuple(np.asarray(Age_Grid,dtype=float).ravel()),
+           None if Filters is None else tuple(Filter.upper() for Filter in Filters),order,Mass_Steps)
+    return _Load_Once(_Mag_Mass_Tables_Cache,key,
+                      lambda: MagMassTables(Grid,Age_Grid=Age_Grid,Filters=Filters,order=order,Mass_Steps=Mass_Steps))
+
+def Mass_to_Mag(Age_Estimate,Mass,Filter="NIRCAM-F444W",Instrument="NIRCAM",Mask="MASK335R",Age_Grid=None):
+    '''
+    '    The inverse of Mag_to_Mass_Array: the absolute magnitude of a companion of a given mass and age, through the cached
+    '    MagMassTables of the instrument/mask (see Load_Mag_Mass_Tables).
+    '
+    '    Inputs:
+    '        Age_Estimate (float/array):  Age(s) of the system in Myr
+    '        Mass (float/array):          Mass(es) in Jupiter masses, broadcast against the ages
+    '        Filter (str/list/None):      A filter, or a list of filters (None for every magnitude column) giving a last axis of
+    '                                     one magnitude per filter. Only the filters asked for are tabulated
+    '        Instrument, Mask:            As Mag_to_Mass
+    '        Age_Grid (array/None):       The ages to tabulate, see MagMassTables
+    '
+    '    Returns:
+    '        (np.ndarray):                The absolute magnitudes, NaN outside of the models' ages and masses
+    '
+    '    Raises:
+    '        FileNotFoundError:           When there are no models for the instrument
+    '''
+    Filters = [Filter] if isinstance(Filter,str) else Filter
+    Tables = Load_Mag_Mass_Tables(Instrument,Mask,Age_Grid=Age_Grid,Filters=Filters)
+    if Tables == None:
+        raise _No_Models_Error(Instrument,Mask)
+    return Tables.Mass_to_Mag(Age_Estimate,Mass,Filter)
 
 def ReshapeData(df):
     """
@@ -100,6 +553,7 @@ def ReshapeData(df):
     '        new_df (pandas.DataFrame):     Recombind Dataframe
     """
     
+    import pandas as pd
     new_df = pd.DataFrame([i[:-1] for i in df[1:].values.tolist()],columns =list(df.keys()[1:]))
     return(new_df)
 
@@ -131,8 +585,95 @@ def InterpolateTheData(Nearest,xi,yi,steps=1000,order=1):
     '
     '    Returns:
     '        (float):                 The value of the spline that is closest to the Desired value
+    '
+    '    Note: the spline is always cubic here, see Evaluate_Spline for an exact evaluation that uses order
     '''
+    from scipy.interpolate import InterpolatedUnivariateSpline as IUS
+    count("interpolation_calls")
     x=np.linspace(min(xi),max(xi),steps)
     s=IUS(xi,yi)
     y=s(x)
     return y[min(range(len(x)), key=lambda i: abs(x[i]-Nearest))]
+
+def Evaluate_Spline(Nearest,xi,yi,order=3):
+    '''
+    '    Exact version of InterpolateTheData, the spline is evaluated at the wanted values themselves rather than at the closest
+    '    point of a linspace, so the precision isnt limited by a step size and any number of values are found in one call
+    '    
+    '    Inputs:
+    '        Nearest (float/array):   The value(s) to evaluate the spline at
+    '        xi,yi (list/array):      The data the spline is fitted to, xi does not need to be sorted
+    '        order (int, {1,2,3}):    the largest power in the spline that will be used
+    '
+    '    Returns:
+    '        (float/np.ndarray):      The value of the spline at Nearest, NaN outside of the range of xi
+    '''
+    from scipy.interpolate import InterpolatedUnivariateSpline as IUS
+    count("interpolation_calls")
+    xi,yi = np.asarray(xi,dtype=float),np.asarray(yi,dtype=float)
+    sort = np.argsort(xi)
+    xi,yi = xi[sort],yi[sort]
+    Nearest = np.asarray(Nearest,dtype=float)
+    in_range = (Nearest >= xi[0]) & (Nearest <= xi[-1])
+    y = np.full(Nearest.shape,np.nan)
+    y[in_range] = IUS(xi,yi,k=order)(Nearest[in_range])
+    return y if y.ndim else float(y)
+
+def Invert_Spline(Value,xi,yi,order=3,iterations=60):
+    '''
+    '    Finds x where the spline of yi(xi) equals Value, for data where yi is monotonic in xi (e.g. the magnitude along a track).
+    '    Each value is bracketed between two tabulated points with np.searchsorted, then the spline is bisected in that bracket,
+    '    all values at once. For order=1 this is the exact linear inverse.
+    '    
+    '    Inputs:
+    '        Value (float/array):     The spline value(s) to invert
+    '        xi,yi (list/array):      The data the spline is fitted to, yi must be monotonic once sorted by xi
+    '        order (int, {1,2,3}):    the largest power in the spline that will be used
+    '        iterations (int):        Bisection steps, each halves the bracket (60 reaches double precision for any bracket)
+    '
+    '    Returns:
+    '        (float/np.ndarray):      x for each value, NaN outside of the range of yi
+    '''
+    from scipy.interpolate import InterpolatedUnivariateSpline as IUS
+    count("interpolation_calls")
+    xi,yi = np.asarray(xi,dtype=float),np.asarray(yi,dtype=float)
+    sort = np.argsort(xi)
+    xi,yi = xi[sort],yi[sort]
+    if not (np.all(np.diff(yi) > 0) or np.all(np.diff(yi) < 0)):
+        raise ValueError("yi must be strictly monotonic in xi to be inverted")
+    sign = 1 if yi[-1] > yi[0] else -1 # work with an increasing function
+    s = IUS(xi,yi,k=order)
+    Value = np.asarray(Value,dtype=float)
+    in_range = (sign*Value >= sign*yi[0]) & (sign*Value <= sign*yi[-1])
+    wanted = sign*Value[in_range]
+    bracket = np.clip(np.searchsorted(sign*yi,wanted),1,len(xi)-1)
+    low,high = xi[bracket-1],xi[bracket]
+    for _ in range(iterations):
+        middle = (low+high)/2
+        below = sign*s(middle) < wanted
+        low = np.where(below,middle,low)
+        high = np.where(below,high,middle)
+    x = np.full(Value.shape,np.nan)
+    x[in_range] = (low+high)/2
+    return x if x.ndim else float(x)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Convert the ATMO 2020 text tracks of Load_Models directories into binary model grids.")
+    parser.add_argument("--instrument", action="append", help="MIRI, NIRISS or NIRCAM, can be given more than once (default: all)")
+    parser.add_argument("--mask", action="append", help="NIRCAM coronagraphic mask(s) (default: all)")
+    parser.add_argument("--output", default=None, help="Output file, only when converting a single instrument/mask")
+    parser.add_argument("--overwrite", action="store_true")
+    args = parser.parse_args()
+
+    Instruments = [Instrument.upper() for Instrument in (args.instrument or ["MIRI","NIRISS","NIRCAM"])]
+    Masks = args.mask or ["MASK210R","MASK335R","MASK430R","MASKLWB","MASKSWB"]
+    Selections = [(Instrument,Mask) for Instrument in Instruments for Mask in (Masks if Instrument == "NIRCAM" else [None])]
+    if args.output is not None and len(Selections) > 1:
+        parser.error("--output can only be used when converting a single instrument/mask")
+    for Instrument,Mask in Selections:
+        try:
+            print(f"Wrote {Convert_Models_To_Binary(Instrument,Mask,Output=args.output,Overwrite=args.overwrite)}")
+        except (FileNotFoundError,FileExistsError) as error:
+            print(f"Skipped {Instrument} {Mask or ''}: {error}")
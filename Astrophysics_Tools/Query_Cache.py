@@ -0,0 +1,163 @@
+'''
+A disk backed cache of SIMBAD/MAST responses, shared by Tools and Simbad_Plus.
+
+Responses are kept in a SQLite file keyed on (kind of query, target, instrument, votable fields, astroquery version),
+expire after a time to live, and the least recently used are dropped once the cache holds more than max_entries.
+In offline mode a query that is not in the cache raises OfflineCacheMiss instead of going to the network.
+
+The cache is off unless enabled, either in code:
+    from Astrophysics_Tools.Query_Cache import enable_query_cache
+    enable_query_cache(ttl=7*24*3600)
+or by setting ASTROPHYSICS_TOOLS_QUERY_CACHE to the cache file ("default" for DEFAULT_CACHE_PATH) before importing,
+ASTROPHYSICS_TOOLS_OFFLINE=1 also turns on offline mode.
+
+Values are stored pickled, only point the cache at files you trust.
+'''
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from .Instrumentation import count, timer
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "Astrophysics_Tools", "query_cache.sqlite")
+DEFAULT_TTL = 7 * 24 * 3600  # seconds
+DEFAULT_MAX_ENTRIES = 10000
+
+
+class OfflineCacheMiss(LookupError):
+    pass
+
+
+class QueryCache:
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: Optional[float] = DEFAULT_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, offline: bool = False) -> None:
+        self.path = path
+        self.ttl = ttl  # None never expires
+        self.max_entries = max_entries
+        self.offline = offline
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("CREATE TABLE IF NOT EXISTS responses ("
+                                 "key TEXT PRIMARY KEY, value BLOB, created REAL, accessed REAL)")
+        self._connection.commit()
+
+    @staticmethod
+    def key(kind: str, target: str, instrument: Optional[str] = None, votable_fields: Optional[list[str]] = None) -> str:
+        import astroquery  # only once a query is made, astroquery is slow to import
+        return json.dumps([kind, target, instrument.upper() if instrument else None,
+                           sorted(str(field) for field in votable_fields or []), astroquery.__version__])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def get(self, key: str) -> Any:
+        # returns None when the key is missing or has expired
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                count("query_cache_misses")
+                return None
+            value, created = row
+            if self.ttl is not None and now - created > self.ttl:
+                self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._connection.commit()
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                count("query_cache_misses")
+                return None
+            self._connection.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._connection.commit()
+            self.stats["hits"] += 1
+        count("query_cache_hits")
+        return pickle.loads(value)
+
+    def put(self, key: str, value: Any) -> None:
+        now = time.time()
+        with self._lock:
+            self._connection.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                                     (key, pickle.dumps(value), now, now))
+            if self.ttl is not None:
+                self._connection.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+            count = self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if count > self.max_entries:
+                self._connection.execute("DELETE FROM responses WHERE key IN "
+                                         "(SELECT key FROM responses ORDER BY accessed LIMIT ?)", (count - self.max_entries,))
+                self.stats["evictions"] += count - self.max_entries
+            self._connection.commit()
+
+    def cached(self, kind: str, target: str, query: Callable[[], Any], instrument: Optional[str] = None,
+               votable_fields: Optional[list[str]] = None) -> Any:
+        # the cached response, or the result of query() which is then stored
+        key = self.key(kind, target, instrument, votable_fields)
+        value = self.get(key)
+        if value is not None:
+            return value
+        if self.offline:
+            raise OfflineCacheMiss(f"{kind} query for {target!r} ({instrument=}) is not cached and the query cache is offline.")
+        value = remote_query(kind, query)
+        if value is not None:
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM responses")
+            self._connection.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+def remote_query(kind: str, query: Callable[[], Any]) -> Any:
+    # every query that goes out to SIMBAD/MAST passes through here, so the Instrumentation counters see the network waits
+    count("remote_queries")
+    with timer(f"remote_query.{kind}"):
+        return query()
+
+
+_query_cache: Optional[QueryCache] = None
+
+
+def enable_query_cache(path: Optional[str] = None, ttl: Optional[float] = DEFAULT_TTL,
+                       max_entries: int = DEFAULT_MAX_ENTRIES, offline: bool = False) -> QueryCache:
+    global _query_cache
+    if _query_cache is not None:
+        _query_cache.close()
+    _query_cache = QueryCache(DEFAULT_CACHE_PATH if path is None else path, ttl=ttl, max_entries=max_entries, offline=offline)
+    return _query_cache
+
+
+def disable_query_cache() -> None:
+    global _query_cache
+    if _query_cache is not None:
+        _query_cache.close()
+    _query_cache = None
+
+
+def get_query_cache() -> Optional[QueryCache]:
+    return _query_cache
+
+
+def cached_query(kind: str, target: str, query: Callable[[], Any], instrument: Optional[str] = None,
+                 votable_fields: Optional[list[str]] = None) -> Any:
+    # goes through the query cache when it is enabled, otherwise just runs the query
+    if _query_cache is None:
+        return remote_query(kind, query)
+    return _query_cache.cached(kind, target, query, instrument=instrument, votable_fields=votable_fields)
+
+
+if os.environ.get("ASTROPHYSICS_TOOLS_QUERY_CACHE"):
+    _path = os.environ["ASTROPHYSICS_TOOLS_QUERY_CACHE"]
+    enable_query_cache(None if _path == "default" else _path,
+                       offline=os.environ.get("ASTROPHYSICS_TOOLS_OFFLINE", "0") not in ("", "0", "false", "False"))
@@ -5,25 +5,61 @@ import astroquery
 from astroquery.simbad import SimbadClass
 from astropy import table
 import logging
+from collections import OrderedDict
 from typing import Optional
+import warnings
+from .Query_Cache import cached_query
+from .Instrumentation import log
 '''
 Basic Simbad functionality with Default votable fields added
 Added functionality to get observations of a target with an instrument and the filters a target was observed in
 '''
 class Simbad_Plus(SimbadClass):
-    _instances = {}
+    # Instances are shared per (target, additional votable fields), the registry keeps the max_instances most recently
+    # used ones, older instances (and their observation tables) are dropped from it and can be garbage collected
+    max_instances = 128
+    _instances = OrderedDict()
+    _registry_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
     def __new__(cls, target: str, *args, **kwargs) -> Self:
-        additional_votable_fields = sorted(kwargs.get("additional_votable_fields", []))
+        additional_votable_fields = args[0] if args else kwargs.get("additional_votable_fields")
+        additional_votable_fields = sorted(additional_votable_fields or [])
         additional_votable_fields_str = ", ".join(additional_votable_fields) if additional_votable_fields else ""
-        if (target, additional_votable_fields_str) in cls._instances:
+        key = (target, additional_votable_fields_str)
+        if key in cls._instances:
             warning = f"This Simbad_Plus instance already exists: {target=}, {additional_votable_fields_str=}"
             logging.warning(warning)
-            return cls._instances[(target, additional_votable_fields_str)]
+            cls._instances.move_to_end(key)
+            cls._registry_stats["hits"] += 1
+            return cls._instances[key]
         instance = super().__new__(cls)
-        cls._instances[(target, additional_votable_fields_str)] = instance
+        cls._instances[key] = instance
+        cls._registry_stats["misses"] += 1
+        while len(cls._instances) > max(cls.max_instances, 1):
+            cls._instances.popitem(last=False)
+            cls._registry_stats["evictions"] += 1
         return instance
 
+    @classmethod
+    def set_max_instances(cls, max_instances: int) -> None:
+        cls.max_instances = max_instances
+        while len(cls._instances) > max(cls.max_instances, 1):
+            cls._instances.popitem(last=False)
+            cls._registry_stats["evictions"] += 1
+
+    @classmethod
+    def registry_stats(cls) -> dict:
+        return {**cls._registry_stats, "size": len(cls._instances), "max_instances": cls.max_instances}
+
+    @classmethod
+    def clear_registry(cls) -> None:
+        cls._instances.clear()
+        for key in cls._registry_stats:
+            cls._registry_stats[key] = 0
+
     def __init__(self, target: str, additional_votable_fields: Optional[list[str]] = None) -> None:
+        if getattr(self, "_initialised", False):
+            return None # an existing instance from the registry, its fields are already set up
         super().__init__()
         is_old_key_names = version.parse(astroquery.__version__) < version.parse("0.4.9")
         if is_old_key_names:
@@ -36,27 +72,63 @@ class Simbad_Plus(SimbadClass):
         self.add_votable_fields(*votable_fields_to_add, *additional_votable_fields)
         self.votable_fields = self.get_votable_fields()
         self.target_name = target
-        self.obs_table = self.get_observations()
-        self.filters = self.get_observed_filters()
+        # Nothing is queried until it is first used, see the obs_table, filters and query properties
+        self._obs_table = None
+        self._filters = None
+        self._query = None
+        self._initialised = True
         return None
 
+    @property
+    def obs_table(self) -> table.Table:
+        # every observation of the target (all missions), queried on first use
+        if self._obs_table is None:
+            self._obs_table = Tools.get_observations(target_name=self.target_name, instrument="ALL")
+        return self._obs_table
+
+    @property
+    def filters(self) -> list[str]:
+        # every filter the target was observed in, worked out from obs_table on first use
+        if self._filters is None:
+            warnings.warn("Filter strings between instruments differ, please be careful when parsing further.", UserWarning)
+            self._filters = Tools.filters_from_observations(self.obs_table, instrument="ALL")
+        return self._filters
+
+    @property
+    def query(self) -> table.Table:
+        # the Simbad query_object result with this instance's votable fields, queried on first use
+        if self._query is None:
+            self._query = self._cached_query_object()
+        return self._query
 
     def get_observations(self, instrument: str ="ALL") -> table.Table:
-        if instrument.upper() == "ALL" and hasattr(self, 'obs_table'):
+        if instrument.upper() == "ALL":
             return self.obs_table
-        # could just filter the table... but this works aswell...
-        return Tools.get_observations(target_name=self.target_name, instrument=instrument)
+        if instrument.upper() not in Tools.list_missions():
+            raise ValueError(f"Instrument \"{instrument.upper()}\" is not supported.\n\
+                        Supported instruments are:\n {Tools.list_missions()}")
+        # filter the table already held rather than querying MAST again
+        if len(self.obs_table) == 0:
+            return table.Table()
+        obs_table = self.obs_table[self.obs_table["obs_collection"] == instrument.upper()]
+        if len(obs_table) == 0:
+            log(f"No JWST observations found for {self.target_name}.")
+            return table.Table()
+        return obs_table
 
 
     def get_observed_filters(self, instrument: str ="ALL") -> list[str]:
-        if instrument.upper() == "ALL" and hasattr(self, 'filters'):
+        if instrument.upper() == "ALL":
             return self.filters
-        return Tools.get_observed_filters_from_mast(target_name=self.target_name, instrument=instrument)
+        return Tools.filters_from_observations(self.get_observations(instrument), instrument=instrument)
 
     def get_query(self) -> table.Table:
-        if not hasattr(self, 'query'):
-            self.query = super().query_object(self.target_name)
-        return self.query #type: ignore
+        return self.query
+
+    def _cached_query_object(self) -> table.Table:
+        # shares the Tools query cache (when enabled), keyed on this instance's votable fields
+        return cached_query("simbad_object", self.target_name, lambda: super(Simbad_Plus, self).query_object(self.target_name),
+                            votable_fields=self.get_votable_fields())
 
     def update_query(self, additional_votable_fields: list[str]) -> None:
         for field in additional_votable_fields:
@@ -64,7 +136,7 @@ class Simbad_Plus(SimbadClass):
                 self.add_votable_fields(field)
 
         self.votable_fields = self.get_votable_fields()
-        self.query = super().query_object(self.target_name)
+        self._query = self._cached_query_object()
         return None
 
     def __str__(self):
@@ -3,41 +3,90 @@ import numpy as np
 import astropy
 import astropy.units as u
 from astropy import table
-from astropy.coordinates import SkyCoord
-
-from astroquery.simbad import Simbad
-from astroquery.mast import Observations
 
 #Type hints
 from .Function_Tools import enforce_types
-from typing import cast, Callable, Optional
+from typing import Iterator, Optional, TYPE_CHECKING
+if TYPE_CHECKING:
+    from astropy.coordinates import SkyCoord
 
 import warnings
+import weakref
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from .Query_Cache import cached_query, get_query_cache, OfflineCacheMiss, remote_query
+from .Instrumentation import log
+
+
+
+# astroquery (slow to import, and it reads its config when imported) and astropy.coordinates are only imported once they are needed
+def _simbad():
+    from astroquery.simbad import Simbad
+    return Simbad()
+
+
+def _observations():
+    from astroquery.mast import Observations
+    return Observations
+
 
+_PLAIN_NUMBERS = (int, float, np.integer, np.floating)  # skip the unit and array handling for a single plain number
 
 
-def Ballesteros(B,V):
-    return 4600*(1/(0.92*(B-V)+1.7)+1/(0.92*(B-V)+0.62))
+def _values_in(values, unit, equivalencies=()):
+    # (plain values in unit, whether they carried a unit): Quantities and table columns with a unit are converted,
+    # masked entries become NaN, anything else array-like (lists, pandas Series, table columns) becomes a float array
+    if isinstance(values, np.ma.MaskedArray):
+        values = values.astype(float).filled(np.nan)  # a MaskedColumn becomes a Column, keeping its unit
+    if isinstance(values, table.Column) and values.unit is not None:
+        values = values.quantity
+    if isinstance(values, u.Quantity):
+        return values.to_value(unit, equivalencies=list(equivalencies)), True
+    if np.ndim(values) == 0:
+        return values, False
+    return np.asarray(values, dtype=float), False
+
+
+def Ballesteros(B, V, out=None):
+    if out is None and isinstance(B, _PLAIN_NUMBERS) and isinstance(V, _PLAIN_NUMBERS):
+        return 4600*(1/(0.92*(B-V)+1.7)+1/(0.92*(B-V)+0.62))
+    B, B_has_unit = _values_in(B, u.mag)
+    V, V_has_unit = _values_in(V, u.mag)
+    colour = np.subtract(B, V, out=out)
+    if np.ndim(colour) == 0:  # e.g. two Quantities
+        temperature = 4600*(1/(0.92*colour+1.7)+1/(0.92*colour+0.62))
+    else:
+        # the same formula worked through in place, so a catalogue column costs the result and one temporary
+        colour *= 0.92
+        hot_term = colour + 1.7
+        np.reciprocal(hot_term, out=hot_term)
+        colour += 0.62
+        temperature = np.reciprocal(colour, out=colour)
+        temperature += hot_term
+        temperature *= 4600
+    return temperature << u.K if B_has_unit or V_has_unit else temperature
 
 
 def arcsecond_separation_between_two_objects(Object1: str, Object2: str) -> float:
 
     if Object1 is None or Object2 is None:
         raise ValueError("Both Object1 and Object2 must be provided.")
-    Simbad_Query = Simbad()
+    from astropy.coordinates import SkyCoord
+    Simbad_Query = _simbad()
 
     ra_str = "RA" if astropy.__version__ <= '0.4.7' else "ra"
     dec_str = "DEC" if astropy.__version__ <= '0.4.7' else "dec"
 
 
-    binary1_data = Simbad_Query.query_object(Object1) 
+    binary1_data = _query_object(Simbad_Query, Object1)
     if binary1_data is None or len(binary1_data) == 0:
         raise ValueError(f"Could not retrieve data for {Object1}")
     
     ra1 = binary1_data[ra_str][0]  # Right Ascension
     dec1 = binary1_data[dec_str][0]  # Declination
 
-    binary2_data = Simbad_Query.query_object(Object2) 
+    binary2_data = _query_object(Simbad_Query, Object2)
     if binary2_data is None or len(binary2_data) == 0:
         raise ValueError(f"Could not retrieve data for {Object2}")
     
@@ -53,6 +102,9 @@ def arcsecond_separation_between_two_objects(Object1: str, Object2: str) -> floa
     return separation
 
 def Convert_Between_Arcsec_and_AU(distance_pc=None, separation_arcsec=None, separation_au=None):
+    # lists/tuples become arrays, so whole catalogues (e.g. a separation_matrix and an array of distances) broadcast together
+    distance_pc, separation_arcsec, separation_au = (np.asarray(value, dtype=float) if isinstance(value, (list, tuple)) else value
+                                                     for value in (distance_pc, separation_arcsec, separation_au))
 
     def Arcsec_to_AU(_separation_arcsec, _distance_pc):
         return _separation_arcsec * _distance_pc
@@ -68,9 +120,71 @@ def Convert_Between_Arcsec_and_AU(distance_pc=None, separation_arcsec=None, sepa
         raise ValueError("Either separation_arcsec or separation_au must be provided.")
     
 
-def Wiens_Law_Microns(temperature_K):
+def Wiens_Law_Microns(temperature_K, out=None):
     b = 2.8977729e-3  # Wien's displacement constant in m*K
-    return b / temperature_K * 1e6  # Convert to microns
+    if out is None and isinstance(temperature_K, _PLAIN_NUMBERS):
+        return b / temperature_K * 1e6  # Convert to microns
+    temperature_K, has_unit = _values_in(temperature_K, u.K, u.temperature())
+    wavelength = np.divide(b, temperature_K, out=out)
+    wavelength = np.multiply(wavelength, 1e6, out=wavelength if np.ndim(wavelength) else None)  # Convert to microns
+    return wavelength << u.micron if has_unit else wavelength
+
+
+def _fits_column_unit(unit: Optional[str]) -> Optional[u.UnitBase]:
+    # None for a column without a unit or with one astropy can't parse, those stay plain numbers
+    if not unit:
+        return None
+    parsed = u.Unit(unit, format="fits", parse_strict="silent")
+    return None if isinstance(parsed, u.UnrecognizedUnit) else parsed
+
+
+def iterate_catalog_chunks(source, columns: list[str], chunk_rows: int = 1_000_000, hdu: int | str = 1) -> Iterator[dict]:
+    # a fits table is memory mapped so only the rows of the chunk are read, a parquet file is read a batch at a time
+    if isinstance(source, str) and source.lower().endswith((".parquet", ".pq")):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as error:
+            raise ImportError("Reading parquet catalogues in chunks needs pyarrow (pip install pyarrow).") from error
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_rows, columns=list(columns)):
+            yield {column: batch.column(column).to_numpy(zero_copy_only=False) for column in columns}
+    elif isinstance(source, str):
+        from astropy.io import fits
+        with fits.open(source, memmap=True) as hdul:
+            data = hdul[hdu].data
+            # keep the TUNITn of each column, so a chunk converts the same way the whole table would
+            units = {column: _fits_column_unit(hdul[hdu].columns[column].unit) for column in columns}
+            for start in range(0, len(data), chunk_rows):
+                chunk = data[start:start + chunk_rows]
+                yield {column: np.array(chunk[column]) if units[column] is None else np.array(chunk[column]) << units[column]
+                       for column in columns}
+    else:
+        # already chunked, e.g. pd.read_csv(..., chunksize=n) or a list of tables
+        for chunk in source:
+            yield {column: chunk[column] for column in columns}
+
+
+def Ballesteros_Chunked(source, B_column: str = "B", V_column: str = "V", chunk_rows: int = 1_000_000,
+                        hdu: int | str = 1) -> Iterator:
+    for chunk in iterate_catalog_chunks(source, [B_column, V_column], chunk_rows, hdu):
+        yield Ballesteros(chunk[B_column], chunk[V_column])
+
+
+def Wiens_Law_Microns_Chunked(source, temperature_column: str = "teff", chunk_rows: int = 1_000_000,
+                              hdu: int | str = 1) -> Iterator:
+    for chunk in iterate_catalog_chunks(source, [temperature_column], chunk_rows, hdu):
+        yield Wiens_Law_Microns(chunk[temperature_column])
+
+
+def _mask_bounding_box(keep: np.ndarray) -> tuple[slice, ...]:
+    # bounding box of the kept pixels from one any-reduction per axis, rather than the indices of every kept pixel
+    if not keep.any():
+        raise ValueError("Mask has no values above 0 to keep.")
+    box = []
+    for axis in range(keep.ndim):
+        other_axes = tuple(other for other in range(keep.ndim) if other != axis)
+        kept = np.flatnonzero(keep.any(axis=other_axes))
+        box.append(slice(kept[0], kept[-1] + 1))
+    return tuple(box)
 
 
 @enforce_types
@@ -81,17 +195,14 @@ def Cookie_Cutter_Mask(data: np.ndarray, mask: np.ndarray) -> np.ndarray:
     if data.ndim != 2 or mask.ndim != 2:
         raise ValueError("Data and mask must be 2D arrays.")
 
-    mask = np.where(mask > 0, 1, 0)  # Convert to binary mask, deals with NaNs aswell
+    keep = mask > 0  # Convert to binary mask, deals with NaNs aswell
 
     # find the bounding box of the masked region
-    y_indices, x_indices = np.where(mask)
-    ymin, ymax = y_indices.min(), y_indices.max() + 1
-    xmin, xmax = x_indices.min(), x_indices.max() + 1
-
+    box = _mask_bounding_box(keep)
 
     # cut out the region of interest from the data and mask
-    cut_out_data = data[ymin:ymax, xmin:xmax]
-    cut_out_mask = mask[ymin:ymax, xmin:xmax]
+    cut_out_data = data[box]
+    cut_out_mask = keep[box].astype(int)
 
     # apply the mask to the cut out data
     masked_applied_data = cut_out_data * cut_out_mask
@@ -99,39 +210,114 @@ def Cookie_Cutter_Mask(data: np.ndarray, mask: np.ndarray) -> np.ndarray:
     return masked_applied_data
 
 
+@enforce_types
+def Cookie_Cutter_Mask_Cube(data: np.ndarray, mask: np.ndarray, out: Optional[np.ndarray] = None, fill: str = "zero",
+                            in_place: bool = False) -> np.ndarray:
+    # the mask covers the last mask.ndim axes of data and is applied to every frame along the leading axes
+    if mask.ndim > data.ndim or data.shape[data.ndim - mask.ndim:] != mask.shape:
+        raise ValueError(f"Mask of shape {mask.shape} does not match the last axes of data of shape {data.shape}.")
+    if fill not in ("zero", "nan"):
+        raise ValueError(f"fill must be 'zero' or 'nan', got {fill!r}.")
+    if in_place and out is not None:
+        raise ValueError("Give either out or in_place, not both.")
+
+    keep = mask > 0  # deals with NaNs aswell
+    box = _mask_bounding_box(keep)
+    cut_out_keep = keep[box]
+    cut_out_data = data[(Ellipsis,) + box]  # a view, no data is copied
+
+    if in_place:
+        result = cut_out_data
+    elif out is not None:
+        if out.shape != cut_out_data.shape:
+            raise ValueError(f"out must have the shape of the cut out, {cut_out_data.shape}, got {out.shape}.")
+        np.copyto(out, cut_out_data)
+        result = out
+    elif cut_out_keep.all():
+        return cut_out_data  # nothing inside the bounding box is masked, so the view is the answer
+    else:
+        result = cut_out_data.copy()
 
-def get_observations(target_name: str, instrument: str = "JWST") -> table.Table:
-    # Recast functions that dont support type hints
-    Observations.list_missions = cast(Callable[[], list[str]], Observations.list_missions)
+    if fill == "nan":
+        if not np.issubdtype(result.dtype, np.floating):
+            raise TypeError(f"fill='nan' needs a floating point array, got {result.dtype}.")
+        np.copyto(result, np.nan, where=~cut_out_keep)
+    else:
+        np.multiply(result, cut_out_keep, out=result)
+    return result
 
-    query = Simbad()
-    result = query.query_object(target_name)
-    if result is None:
-        raise ValueError(f"Target '{target_name}' not found in SIMBAD.")
-    
-    target_name = result['main_id'][0]
 
+def _votable_fields(simbad) -> list[str]:
+    get_votable_fields = getattr(simbad, "get_votable_fields", None)
+    return list(get_votable_fields()) if get_votable_fields is not None else []
+
+
+def _query_object(simbad, target_name: str) -> Optional[table.Table]:
+    # Simbad query_object through the query cache (when enabled), keyed on the votable fields asked for
+    return cached_query("simbad_object", target_name, lambda: simbad.query_object(target_name),
+                        votable_fields=_votable_fields(simbad))
+
+
+def _query_criteria(observations, main_id: str, instrument: str, use_cache: bool = True) -> table.Table:
+    query = lambda: observations.query_criteria(objectname=main_id, obs_collection=instrument) # type: ignore
+    if not use_cache:
+        return remote_query("mast_observations", query)
+    return cached_query("mast_observations", main_id, query, instrument=instrument)
+
+
+# the mission list barely changes, so it is only asked for once per Observations service. Only the default service's list goes
+# through the persistent query cache, whose keys can't tell services apart, the lists of services passed in are kept while they live
+_default_missions: Optional[list[str]] = None
+_service_missions: "weakref.WeakKeyDictionary[object, list[str]]" = weakref.WeakKeyDictionary()
+
+def list_missions(observations=None) -> list[str]:
+    global _default_missions
+    if observations is None:
+        if _default_missions is None:
+            service = _observations()
+            _default_missions = cached_query("mast_missions", "", lambda: list(service.list_missions()))
+        return _default_missions
+    try:
+        return _service_missions[observations]
+    except KeyError:
+        pass
+    except TypeError:
+        return remote_query("mast_missions", lambda: list(observations.list_missions()))  # can't be weakly referenced, not kept
+    missions = _service_missions[observations] = remote_query("mast_missions", lambda: list(observations.list_missions()))
+    return missions
+
+
+def _check_instrument(instrument: str, observations=None) -> str:
     instrument = instrument.upper()
-    if instrument != "ALL" and instrument not in Observations.list_missions():
+    if instrument != "ALL" and instrument not in list_missions(observations):
         raise ValueError(f"Instrument \"{instrument}\" is not supported.\n\
-                        Supported instruments are:\n {Observations.list_missions()}")
+                        Supported instruments are:\n {list_missions(observations)}")
     if instrument == "ALL":
         instrument = "*"
+    return instrument
 
-    obs_table = Observations.query_criteria(objectname=target_name, obs_collection=instrument) # type: ignore
+
+def get_observations(target_name: str, instrument: str = "JWST") -> table.Table:
+    query = _simbad()
+    result = _query_object(query, target_name)
+    if result is None:
+        raise ValueError(f"Target '{target_name}' not found in SIMBAD.")
+    
+    target_name = result['main_id'][0]
+
+    instrument = _check_instrument(instrument)
+
+    obs_table = _query_criteria(_observations(), target_name, instrument)
 
     if len(obs_table) == 0:
-        print(f"No JWST observations found for {target_name}.")
+        log(f"No JWST observations found for {target_name}.")
         return table.Table()
     return obs_table
 
 
-def get_observed_filters_from_mast(target_name: str, instrument: str = "JWST") -> list[str]:
-    if instrument.upper() == "ALL":
-        warnings.warn("Filter strings between instruments differ, please be careful when parsing further.", UserWarning)
-
-    obs_table = get_observations(target_name = target_name, instrument = instrument)
-
+def filters_from_observations(obs_table: table.Table, instrument: str = "JWST") -> list[str]:
+    if len(obs_table) == 0:
+        return []
     # filters = set(obs_table["filters"].astype(str)) #type: ignore
     filters = set(str(filt) for filt in obs_table["filters"]) 
     
@@ -145,3 +331,162 @@ def get_observed_filters_from_mast(target_name: str, instrument: str = "JWST") -
         
     return sorted(list(filter_names))
 
+
+def get_observed_filters_from_mast(target_name: str, instrument: str = "JWST") -> list[str]:
+    if instrument.upper() == "ALL":
+        warnings.warn("Filter strings between instruments differ, please be careful when parsing further.", UserWarning)
+
+    obs_table = get_observations(target_name = target_name, instrument = instrument)
+    return filters_from_observations(obs_table, instrument = instrument)
+
+
+def _simbad_rows_in_order(queried: table.Table, target_names: list[str]) -> table.Table:
+    # query_objects doesn't promise the input order, object_number_id (the 1-based position in the query) or user_specified_id
+    # say which row answers which target. Only when neither column is there are the rows taken in the order they came
+    if "object_number_id" in queried.colnames:
+        numbers = np.asarray(queried["object_number_id"])
+        order = np.argsort(numbers, kind="stable")
+        if not np.array_equal(numbers[order], np.arange(1, len(target_names) + 1)):
+            raise ValueError("SIMBAD did not return one row per target.")
+        return queried[order]
+    if "user_specified_id" in queried.colnames:
+        positions: dict[str, list[int]] = {}
+        for i, user_specified_id in enumerate(queried["user_specified_id"]):
+            positions.setdefault(str(user_specified_id).strip(), []).append(i)
+        try:
+            order = [positions[str(target_name).strip()].pop(0) for target_name in target_names]
+        except (KeyError, IndexError):
+            raise ValueError("SIMBAD did not return one row per target.") from None
+        return queried[order]
+    return queried
+
+
+def resolve_targets(target_names: list[str], simbad=None) -> table.Table:
+    # one SIMBAD query for the whole list (only the targets not in the query cache), rows come back in the order of target_names.
+    # A simbad passed in bypasses the query cache, whose keys can't tell services apart
+    cache = get_query_cache() if simbad is None else None
+    simbad = _simbad() if simbad is None else simbad
+    if cache is None:
+        result = remote_query("simbad_objects", lambda: simbad.query_objects(list(target_names)))
+        if result is None or len(result) != len(target_names):
+            raise ValueError("SIMBAD did not return one row per target.")
+        result = _simbad_rows_in_order(result, list(target_names))
+    else:
+        votable_fields = _votable_fields(simbad)
+        rows = {}
+        for target_name in dict.fromkeys(target_names):
+            row = cache.get(cache.key("simbad_objects", target_name, votable_fields=votable_fields))
+            if row is not None:
+                rows[target_name] = row
+        to_query = [target_name for target_name in dict.fromkeys(target_names) if target_name not in rows]
+        if to_query:
+            if cache.offline:
+                raise OfflineCacheMiss(f"SIMBAD rows for {to_query} are not cached and the query cache is offline.")
+            queried = remote_query("simbad_objects", lambda: simbad.query_objects(to_query))
+            if queried is None or len(queried) != len(to_query):
+                raise ValueError("SIMBAD did not return one row per target.")
+            queried = _simbad_rows_in_order(queried, to_query)
+            for i, target_name in enumerate(to_query):
+                rows[target_name] = queried[i:i+1]
+                cache.put(cache.key("simbad_objects", target_name, votable_fields=votable_fields), rows[target_name])
+        result = table.vstack([rows[target_name] for target_name in target_names])
+    main_id_str = "main_id" if "main_id" in result.colnames else "MAIN_ID"
+    missing = [name for name, main_id in zip(target_names, result[main_id_str])
+               if np.ma.is_masked(main_id) or str(main_id).strip() == ""]
+    if missing:
+        raise ValueError(f"Targets {missing} not found in SIMBAD.")
+    return result
+
+
+def get_observations_batch(target_names: list[str], instrument: str = "JWST", max_concurrency: int = 8,
+                           simbad=None, observations=None) -> dict[str, table.Table]:
+    use_cache = observations is None  # as resolve_targets, only the default service goes through the query cache
+    resolved = resolve_targets(target_names, simbad=simbad)
+    main_id_str = "main_id" if "main_id" in resolved.colnames else "MAIN_ID"
+    instrument = _check_instrument(instrument, observations)
+    observations = _observations() if observations is None else observations
+
+    def query(main_id):
+        obs_table = _query_criteria(observations, main_id, instrument, use_cache)
+        return obs_table if len(obs_table) > 0 else table.Table()
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        obs_tables = list(executor.map(query, [str(main_id) for main_id in resolved[main_id_str]]))
+    return dict(zip(target_names, obs_tables))
+
+
+async def get_observations_batch_async(target_names: list[str], instrument: str = "JWST", max_concurrency: int = 8,
+                                       simbad=None, observations=None) -> dict[str, table.Table]:
+    use_cache = observations is None
+    resolved = await asyncio.to_thread(resolve_targets, target_names, simbad)
+    main_id_str = "main_id" if "main_id" in resolved.colnames else "MAIN_ID"
+    instrument = await asyncio.to_thread(_check_instrument, instrument, observations)
+    observations = _observations() if observations is None else observations
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def query(main_id):
+        async with semaphore:
+            obs_table = await asyncio.to_thread(_query_criteria, observations, main_id, instrument, use_cache)
+        return obs_table if len(obs_table) > 0 else table.Table()
+
+    obs_tables = await asyncio.gather(*(query(str(main_id)) for main_id in resolved[main_id_str]))
+    return dict(zip(target_names, obs_tables))
+
+
+def get_observed_filters_batch(target_names: list[str], instrument: str = "JWST", max_concurrency: int = 8,
+                               simbad=None, observations=None) -> dict[str, list[str]]:
+    if instrument.upper() == "ALL":
+        warnings.warn("Filter strings between instruments differ, please be careful when parsing further.", UserWarning)
+    obs_tables = get_observations_batch(target_names, instrument=instrument, max_concurrency=max_concurrency,
+                                        simbad=simbad, observations=observations)
+    return {target_name: filters_from_observations(obs_table, instrument=instrument) for target_name, obs_table in obs_tables.items()}
+
+
+def _is_angle_unit(unit) -> bool:
+    # None and units astropy could not parse (e.g. "h:m:s") are not
+    return unit is not None and u.Unit(unit).is_equivalent(u.deg)
+
+
+def resolve_coordinates(objects, simbad=None) -> "SkyCoord":
+    from astropy.coordinates import SkyCoord
+    # SkyCoords are used as they are, tables need ra/dec columns, anything else is a list of names resolved in one SIMBAD call
+    if isinstance(objects, SkyCoord):
+        return objects
+    if isinstance(objects, str):
+        objects = [objects]
+    if not isinstance(objects, table.Table):
+        objects = resolve_targets(list(objects), simbad=simbad)
+    ra_str = "ra" if "ra" in objects.colnames else "RA"
+    dec_str = "dec" if "dec" in objects.colnames else "DEC"
+    ra, dec = objects[ra_str], objects[dec_str]
+    # strings first, astroquery < 0.4.8 gives sexagesimal strings with "h:m:s"/"d:m:s" as their unit
+    if ra.dtype.kind in "US" or ra.dtype == object:
+        return SkyCoord(ra=list(ra), dec=list(dec), unit=(u.hourangle, u.deg)) # type: ignore
+    if _is_angle_unit(ra.unit) and _is_angle_unit(dec.unit):
+        return SkyCoord(ra=np.asarray(ra, dtype=float) * ra.unit, dec=np.asarray(dec, dtype=float) * dec.unit) # type: ignore
+    return SkyCoord(ra=np.asarray(ra, dtype=float), dec=np.asarray(dec, dtype=float), unit=(u.deg, u.deg)) # type: ignore
+
+
+def separation_matrix(objects1, objects2=None, paired: bool = False, simbad=None) -> np.ndarray:
+    coords1 = resolve_coordinates(objects1, simbad=simbad)
+    coords2 = coords1 if objects2 is None else resolve_coordinates(objects2, simbad=simbad)
+    if paired:
+        if len(coords1) != len(coords2):
+            raise ValueError("Paired separations need the same number of objects in objects1 and objects2.")
+        return coords1.separation(coords2).to(u.arcsecond).value # type: ignore
+    # broadcasting (N, 1) against (1, M) gives every pair in one evaluation
+    return coords1[:, np.newaxis].separation(coords2[np.newaxis, :]).to(u.arcsecond).value # type: ignore
+
+
+def pairs_within(objects1, radius_arcsec: float, objects2=None, simbad=None) -> table.Table:
+    coords1 = resolve_coordinates(objects1, simbad=simbad)
+    coords2 = coords1 if objects2 is None else resolve_coordinates(objects2, simbad=simbad)
+    # search_around_sky matches through a KD-tree, so this scales as N log M rather than N*M
+    # (it returns the indices into its argument first, then into the coordinates it is called on)
+    index2, index1, separation, _ = coords1.search_around_sky(coords2, radius_arcsec * u.arcsecond) # type: ignore
+    if objects2 is None:
+        keep = index1 < index2 # each pair once, and not objects paired with themselves
+        index1, index2, separation = index1[keep], index2[keep], separation[keep]
+    order = np.lexsort((index2, index1))
+    return table.Table({"index1": index1[order], "index2": index2[order],
+                        "separation_arcsec": separation[order].to(u.arcsecond).value})
@@ -1,18 +1,24 @@
 import numpy as np
+import astropy.units as u
+from typing import Iterable, Iterator
 from astropy.table import table
+from astropy.coordinates import SkyCoord
 
 from .Function_Tools import enforce_types
 
 
-def Ballesteros(B: float, V: float) -> float:
+def Ballesteros(B: float | np.ndarray | u.Quantity, V: float | np.ndarray | u.Quantity,
+                out: np.ndarray | None = None) -> float | np.ndarray | u.Quantity:
     '''
     Returns an approximation for the temperature of an object in Kelvin, given its B and V magnitudes
+    Works element-wise on whole catalogue columns (arrays, lists, pandas Series, astropy table columns), broadcasting B against V.
     Inputs
-    B (float): B magnitude
-    V (float); V magnitude
+    B (float/array/Quantity): B magnitude, Quantities and table columns with a unit are converted to mag
+    V (float/array/Quantity); V magnitude
+    out (np.ndarray, optional): A float array of the broadcast shape to write the temperatures into
 
     returns:
-    Calculated Temperature (K)
+    Calculated Temperature (K), a Quantity in K when B or V carried a unit. Masked entries come out as NaN.
     '''
     ...
 def arcsecond_separation_between_two_objects(Object1: str, Object2: str) -> np.float64:
@@ -26,9 +32,10 @@ def arcsecond_separation_between_two_objects(Object1: str, Object2: str) -> np.f
     separation (float: u.arcsecond): Separation in arcseconds with astropy unit arcsecond
     '''
     ...
-def Convert_Between_Arcsec_and_AU(distance_pc: float, separation_arcsec: float | None = None, separation_au: float | None = None) -> float:
+def Convert_Between_Arcsec_and_AU(distance_pc: float | np.ndarray, separation_arcsec: float | np.ndarray | None = None, separation_au: float | np.ndarray | None = None) -> float | np.ndarray:
     '''
     Converts between arcsecond separation and Astronomical Units (AU) based on distance in parsecs.
+    Arrays (and lists) of distances and separations broadcast against each other.
     
     Inputs:
         distance_pc (float): Distance in parsecs
@@ -39,14 +46,44 @@ def Convert_Between_Arcsec_and_AU(distance_pc: float, separation_arcsec: float |
         float: Either the separation in arcseconds or AU, depending on the input provided.
     '''
     ...
-def Wiens_Law_Microns(temperature_K : float) -> float:
+def Wiens_Law_Microns(temperature_K: float | np.ndarray | u.Quantity, out: np.ndarray | None = None) -> float | np.ndarray | u.Quantity:
     '''
     Returns the wavelength of peak emission for a black body at a given temperature using Wien's Law.
+    Works element-wise on whole catalogue columns, as Ballesteros does.
     
     Inputs:
-        Temperature (float): Temperature in Kelvin
+        Temperature (float/array/Quantity): Temperature in Kelvin, Quantities (including deg_C) and table columns with a unit are converted
+        out (np.ndarray, optional): A float array of the same shape to write the wavelengths into
     Returns:
-        float: Wavelength in microns (um)
+        float: Wavelength in microns (um), a Quantity in micron when the temperature carried a unit
+    '''
+    ...
+def iterate_catalog_chunks(source: str | Iterable, columns: list[str], chunk_rows: int = 1_000_000, hdu: int | str = 1) -> Iterator[dict]:
+    '''
+    Reads the columns of a catalogue too large to hold in memory a chunk of rows at a time.
+
+    Parameters:
+        source: A fits table (memory mapped, so only the rows of each chunk are read), a .parquet file (needs pyarrow),
+                or an iterable of chunks that can be indexed by column name (e.g. pd.read_csv(..., chunksize=n)).
+        columns (list): The columns to read.
+        chunk_rows (int): Rows per chunk, for fits and parquet files.
+        hdu (int/str): The fits extension holding the table.
+
+    Yields:
+        dict: {column: values} for each chunk, in file order. Fits columns with a unit (TUNITn) are Quantities, as they
+              would be in the whole table.
+    '''
+    ...
+def Ballesteros_Chunked(source: str | Iterable, B_column: str = "B", V_column: str = "V", chunk_rows: int = 1_000_000,
+                        hdu: int | str = 1) -> Iterator[np.ndarray | u.Quantity]:
+    '''
+    Ballesteros over a catalogue read with iterate_catalog_chunks, yielding the temperatures of each chunk.
+    '''
+    ...
+def Wiens_Law_Microns_Chunked(source: str | Iterable, temperature_column: str = "teff", chunk_rows: int = 1_000_000,
+                              hdu: int | str = 1) -> Iterator[np.ndarray | u.Quantity]:
+    '''
+    Wiens_Law_Microns over a catalogue read with iterate_catalog_chunks, yielding the wavelengths of each chunk.
     '''
     ...
 @enforce_types
@@ -66,6 +103,23 @@ def Cookie_Cutter_Mask(data: np.ndarray, mask: np.ndarray) -> np.ndarray:
         np.ndarray: The masked data.
     """
     ...
+@enforce_types
+def Cookie_Cutter_Mask_Cube(data: np.ndarray, mask: np.ndarray, out: np.ndarray | None = None, fill: str = "zero",
+                            in_place: bool = False) -> np.ndarray:
+    """
+    Cookie_Cutter_Mask for image cubes: one 2D (or higher) mask is applied to every frame of a 3D/4D cube.
+    The bounding box of the mask is found once and the data is cut to it with a view, so nothing is copied until the mask is applied.
+    Parameters:
+        data (np.ndarray): The data to be masked, e.g. (integrations, groups, y, x).
+        mask (np.ndarray): The binary mask, with the shape of the last axes of data. Values above 0 are kept.
+        out (np.ndarray, optional): A preallocated array with the shape of the cut out to write the result into.
+        fill (str): "zero" multiplies the masked pixels by 0 (as Cookie_Cutter_Mask), "nan" sets them to NaN (floating point data only).
+        in_place (bool): Apply the mask to data itself and return the cut out view of it.
+    Returns:
+        np.ndarray: The masked data, (..., box_y, box_x). When out and in_place are not given and nothing inside the
+            bounding box is masked, this is a view of data.
+    """
+    ...
 def get_observations(target_name: str, instrument: str = "JWST") -> table.Table:
     '''
     Retrieves the observations for a given target from the MAST database.
@@ -92,3 +146,122 @@ def get_observed_filters_from_mast(target_name: str, instrument: str = "JWST") -
     '''
     ...
 
+def list_missions(observations=None) -> list[str]:
+    '''
+    Returns the MAST mission list, it is only requested once per Observations service and then kept (for as long as the service lives).
+
+    Parameters:
+        observations: The astroquery Observations service (or a stand-in with the same methods), default astroquery.mast.Observations.
+                      Only the default service's list goes through the persistent query cache.
+
+    Returns:
+        list[str]: The missions (obs_collection values) MAST knows about.
+    '''
+    ...
+def filters_from_observations(obs_table: table.Table, instrument: str = "JWST") -> list[str]:
+    '''
+    Returns the observed filters in an observations table, see get_observed_filters_from_mast.
+
+    Parameters:
+        obs_table (table.Table): Observations from get_observations.
+        instrument (str): The instrument the table was queried for, JWST "filter;pupil" strings are reduced to the filter.
+
+    Returns:
+        list[str]: A list of observed filter names.
+    '''
+    ...
+def resolve_targets(target_names: list[str], simbad=None) -> table.Table:
+    '''
+    Resolves a list of names with a single SIMBAD query_objects call.
+
+    Parameters:
+        target_names (list[str]): Simbad queriable objects.
+        simbad: A Simbad instance (or a stand-in with query_objects), default a new astroquery Simbad().
+                When given, the persistent query cache is bypassed, its keys can't tell services apart.
+
+    Returns:
+        table.Table: One row per target, in the order of target_names. Rows are matched to targets on SIMBAD's
+                     object_number_id (or user_specified_id) column, by position only when it returns neither.
+
+    Raises:
+        ValueError: listing every target SIMBAD could not resolve, or when its rows can't be matched one to one.
+    '''
+    ...
+def get_observations_batch(target_names: list[str], instrument: str = "JWST", max_concurrency: int = 8,
+                           simbad=None, observations=None) -> dict[str, table.Table]:
+    '''
+    get_observations for a list of targets. The names are resolved in one SIMBAD call, the mission list is cached
+    and the MAST queries are run concurrently, at most max_concurrency at a time.
+    simbad and observations can be replaced by local stand-ins (e.g. a mock service for testing) providing
+    query_objects, and list_missions/query_criteria respectively. Their answers bypass the persistent query cache.
+
+    Parameters:
+        target_names (list[str]): Simbad queriable objects.
+        instrument (str): The name of the instrument used for observations (default is "JWST"), "ALL" for every mission.
+        max_concurrency (int): The most MAST queries in flight at once.
+        simbad: See resolve_targets.
+        observations: The astroquery Observations service, default astroquery.mast.Observations.
+
+    Returns:
+        dict[str, table.Table]: {target name: observations}, empty tables for targets without observations.
+    '''
+    ...
+async def get_observations_batch_async(target_names: list[str], instrument: str = "JWST", max_concurrency: int = 8,
+                                       simbad=None, observations=None) -> dict[str, table.Table]:
+    '''
+    asyncio version of get_observations_batch, the blocking astroquery calls run in threads and a semaphore keeps
+    at most max_concurrency MAST queries in flight.
+    '''
+    ...
+def get_observed_filters_batch(target_names: list[str], instrument: str = "JWST", max_concurrency: int = 8,
+                               simbad=None, observations=None) -> dict[str, list[str]]:
+    '''
+    get_observed_filters_from_mast for a list of targets, see get_observations_batch.
+
+    Returns:
+        dict[str, list[str]]: {target name: observed filter names}
+    '''
+    ...
+def resolve_coordinates(objects, simbad=None) -> SkyCoord:
+    '''
+    Turns a batch of objects into a single (array) SkyCoord.
+
+    Parameters:
+        objects: A SkyCoord (returned as it is), a table with ra/dec columns, or a list of Simbad queriable names
+                 (resolved with one resolve_targets call).
+        simbad: See resolve_targets.
+
+    Returns:
+        SkyCoord: One coordinate per object, in order.
+    '''
+    ...
+def separation_matrix(objects1, objects2=None, paired: bool = False, simbad=None) -> np.ndarray:
+    '''
+    Angular separations between many objects in one vectorised SkyCoord evaluation.
+    Names are resolved in a single SIMBAD call (see resolve_coordinates).
+
+    Parameters:
+        objects1, objects2: Anything resolve_coordinates accepts. objects2 defaults to objects1.
+        paired (bool): Separate objects1[i] from objects2[i] rather than every object from every other.
+        simbad: See resolve_targets.
+
+    Returns:
+        np.ndarray: Separations in arcseconds, (N,) when paired, otherwise (N, M).
+                    Pass them (with an array of distances) to Convert_Between_Arcsec_and_AU for AU.
+    '''
+    ...
+def pairs_within(objects1, radius_arcsec: float, objects2=None, simbad=None) -> table.Table:
+    '''
+    Finds every pair of objects closer than radius_arcsec, using astropy's KD-tree (search_around_sky)
+    rather than the full separation matrix.
+
+    Parameters:
+        objects1, objects2: Anything resolve_coordinates accepts. Without objects2, pairs within objects1 are found,
+                            each pair once.
+        radius_arcsec (float): Search radius in arcseconds.
+        simbad: See resolve_targets.
+
+    Returns:
+        table.Table: index1, index2 (positions in objects1/objects2) and separation_arcsec, sorted by index1 then index2.
+    '''
+    ...
@@ -1,6 +1,62 @@
-from .FindNumberOfGroups import *
-from .MagToMass import *
-from .File_Tools import *
-from .Tools import *
+# The submodules are only imported when one of their names is first used (PEP 562), so importing the package doesn't pull in
+# astroquery, pandas or scipy, e.g. a worker process that only needs FindNumGroups only loads FindNumberOfGroups.
+# The public names are the same as the star imports this replaces: from .FindNumberOfGroups import *, from .MagToMass import *,
+# from .File_Tools import *, from .Tools import *, from .Contrast_To_Mass import *
+import importlib
 
 from ._version import __version__, __version_tuple__
+
+_SUBMODULES = ["FindNumberOfGroups", "MagToMass", "File_Tools", "Tools", "Contrast_To_Mass"]  # the order of the star imports, later ones win
+
+_PUBLIC_NAMES = {
+    "FindNumberOfGroups": ["Match_Groups", "Load_Ramp_Crop", "Iterate_Integration_Crops", "FindNumGroups", "FindNumGroups_batch"],
+    "MagToMass": ["Load_Models", "ModelGrid", "Load_Model_Grid", "Convert_Models_To_Binary", "Model_Grid_Cache_Info",
+                  "Clear_Model_Grid_Cache", "Mag_to_Mass", "Mag_to_Mass_Array", "MagMassTables",
+                  "Load_Mag_Mass_Tables", "Mass_to_Mag", "ReshapeData", "RemoveZerosFromConnectedList",
+                  "InterpolateTheData", "Evaluate_Spline", "Invert_Spline", "BINARY_GRID_NAME", "MODEL_GRID_CACHE_SIZE"],
+    "File_Tools": ["Read_Header_Keywords", "Classify_Header", "Iterate_File_Types", "Find_File_Types", "FileTypeTable", "DirectoryWatcher",
+                   "Get_Contrast_Separation_From_Calcon", "Read_KLmodes", "CalconIndex", "Find_Calcon_Sets", "FILE_TYPES",
+                   "CLASSIFIER_KEYWORDS", "TABLE_KEYWORDS", "CALCON_FILE_PATTERN", "CALCON_DIR_PATTERN"],
+    "Tools": ["Ballesteros", "arcsecond_separation_between_two_objects", "Convert_Between_Arcsec_and_AU", "Wiens_Law_Microns",
+              "iterate_catalog_chunks", "Ballesteros_Chunked", "Wiens_Law_Microns_Chunked",
+              "Cookie_Cutter_Mask", "Cookie_Cutter_Mask_Cube", "list_missions", "get_observations", "filters_from_observations",
+              "get_observed_filters_from_mast", "resolve_targets", "get_observations_batch", "get_observations_batch_async",
+              "get_observed_filters_batch", "resolve_coordinates", "separation_matrix", "pairs_within"],
+    "Contrast_To_Mass": ["Contrast_to_Absolute_Magnitude", "Contrast_Curve_To_Mass_Curve", "Contrast_To_Mass_Table"],
+}
+# third party names the star imports happened to re-export, imported on first use like everything else
+_REEXPORTS = {"pd": ("pandas", None), "IUS": ("scipy.interpolate", "InterpolatedUnivariateSpline"),
+              "const": ("astropy.constants", None), "SkyCoord": ("astropy.coordinates", "SkyCoord"),
+              "Simbad": ("astroquery.simbad", "Simbad"), "Observations": ("astroquery.mast", "Observations")}
+_NAME_TO_MODULE = {name: module for module in _SUBMODULES for name in _PUBLIC_NAMES[module]}
+
+__all__ = list(_NAME_TO_MODULE) + ["__version__", "__version_tuple__"]
+
+
+def __getattr__(name):
+    if name in _NAME_TO_MODULE:
+        value = getattr(importlib.import_module(f".{_NAME_TO_MODULE[name]}", __name__), name)
+    elif name in _SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    elif name in _REEXPORTS:
+        module, attribute = _REEXPORTS[name]
+        value = importlib.import_module(module)
+        if attribute is not None:
+            value = getattr(value, attribute)
+    elif name.startswith("_"):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    else:
+        # anything else the star imports used to bring in (e.g. enforce_types), looked up the way they would have shadowed each other
+        for module in reversed(_SUBMODULES):
+            submodule = importlib.import_module(f".{module}", __name__)
+            if hasattr(submodule, name):
+                value = getattr(submodule, name)
+                break
+        else:
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value  # only looked up once
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_NAME_TO_MODULE) | set(_SUBMODULES))
@@ -0,0 +1,12 @@
+'''
+asv benchmarks of the package's entry points, on synthetic inputs written by benchmarks/fixtures.py (no data or network needed).
+
+    asv run                              # time/peak memory of every benchmark for the current commit
+    asv run --bench FindNumGroups        # a subset, by regular expression
+    asv continuous main HEAD             # run both commits and report benchmarks that changed by more than 10%
+    asv compare <baseline> <commit>      # compare stored results, e.g. against the results of a release tag
+    asv publish && asv preview           # browse the stored results over the history
+
+Results are stored under .asv/results (see asv.conf.json), and are the baseline later runs are compared against.
+track_ benchmarks record outputs (best group, mean mass, ...) alongside the timings, so a change in results shows up in asv compare as well.
+'''
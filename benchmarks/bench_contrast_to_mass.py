@@ -0,0 +1,35 @@
+'''
+Time of converting a directory of calcon result sets into mass curves (Contrast_To_Mass.Contrast_To_Mass_Table).
+Run with asv (see asv.conf.json), e.g. `asv run --bench ContrastToMass`
+'''
+import os
+
+from Astrophysics_Tools.Contrast_To_Mass import Contrast_To_Mass_Table
+from Astrophysics_Tools.MagToMass import Clear_Model_Grid_Cache, Load_Model_Grid
+
+from .fixtures import fixture, write_calcon_directory, atmo_models_path
+
+
+class ContrastToMass:
+    params = [[6, 60], [50, 1000]]
+    param_names = ["n_sets", "n_separations"]
+
+    def setup(self, n_sets, n_separations):
+        self.directory = fixture("calcon", write_calcon_directory, n_sets=n_sets, n_separations=n_separations)
+        self._models_before = os.environ.get("ATMO_2020_MODELS")
+        os.environ["ATMO_2020_MODELS"] = atmo_models_path()
+        Clear_Model_Grid_Cache()
+        Load_Model_Grid("NIRCAM", "MASK335R")
+
+    def teardown(self, n_sets, n_separations):
+        if self._models_before is None:
+            os.environ.pop("ATMO_2020_MODELS", None)
+        else:
+            os.environ["ATMO_2020_MODELS"] = self._models_before
+        Clear_Model_Grid_Cache()
+
+    def time_contrast_to_mass_table(self, n_sets, n_separations):
+        Contrast_To_Mass_Table(self.directory, 8.0, 20.0, 500, verbose=False)
+
+    def peakmem_contrast_to_mass_table(self, n_sets, n_separations):
+        Contrast_To_Mass_Table(self.directory, 8.0, 20.0, 500, verbose=False)
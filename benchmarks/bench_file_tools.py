@@ -0,0 +1,115 @@
+'''
+Time and peak memory of sorting a directory of uncal files (File_Tools.Find_File_Types), with and without a HeaderIndex,
+as lists and as a FileTypeTable, of picking up new arrivals with File_Tools.DirectoryWatcher, and of reading calcon result sets (File_Tools.CalconIndex).
+Run with asv (see asv.conf.json), e.g. `asv run --bench FindFileTypes`
+'''
+import os
+import shutil
+import tempfile
+
+from Astrophysics_Tools.File_Tools import Find_File_Types, Read_Header_Keywords, DirectoryWatcher, CalconIndex
+from Astrophysics_Tools.Header_Index import HeaderIndex
+
+from .fixtures import fixture, write_fits_directory, write_calcon_directory
+
+
+class FindFileTypes:
+    params = [[10, 100, 1000], [1, 8]]
+    param_names = ["n_files", "max_workers"]
+    timeout = 300
+
+    def setup(self, n_files, max_workers):
+        self.directory = fixture("fits_directory", write_fits_directory, n_files=n_files) + os.sep
+        self.index_dir = tempfile.mkdtemp()
+        self.index = HeaderIndex(self.directory, index_path=os.path.join(self.index_dir, "index.sqlite"), max_workers=max_workers)
+        self.index.headers()  # warm, as it would be on every scan after the first
+
+    def teardown(self, n_files, max_workers):
+        self.index.close()
+        shutil.rmtree(self.index_dir)
+
+    def time_find_file_types(self, n_files, max_workers):
+        Find_File_Types(self.directory, verbose=False, max_workers=max_workers)
+
+    def peakmem_find_file_types(self, n_files, max_workers):
+        Find_File_Types(self.directory, verbose=False, max_workers=max_workers)
+
+    def time_find_file_types_indexed(self, n_files, max_workers):
+        Find_File_Types(self.directory, verbose=False, use_index=self.index)
+
+    def time_find_file_types_table(self, n_files, max_workers):
+        Find_File_Types(self.directory, verbose=False, max_workers=max_workers, as_table=True)
+
+    def track_n_science(self, n_files, max_workers):
+        return len(Find_File_Types(self.directory, verbose=False, max_workers=max_workers)["Science"])
+
+
+class FileTypeTableQueries:
+    # the filtering downstream code does on the result, against the same on the lists of paths (reopening headers)
+    params = [[100, 1000]]
+    param_names = ["n_files"]
+
+    def setup(self, n_files):
+        self.directory = fixture("fits_directory", write_fits_directory, n_files=n_files) + os.sep
+        self.table = Find_File_Types(self.directory, verbose=False, as_table=True)
+        self.lists = self.table.to_dict()
+
+    def time_filter_table(self, n_files):
+        self.table.filter(category="Reference", FILTER="F444W", NGROUPS=[5, 10])
+
+    def time_group_by_filter_and_category(self, n_files):
+        self.table.group_by("FILTER", "category")
+
+    def time_filter_lists_rereading_headers(self, n_files):
+        [path for path in self.lists["Reference"]
+         if Read_Header_Keywords(path, ["FILTER", "NGROUPS"]) == {"FILTER": "F444W", "NGROUPS": 10}]
+
+
+class WatchDirectory:
+    # an ingest node's poll against re-running Find_File_Types over the whole directory
+    params = [[10, 100, 1000]]
+    param_names = ["n_files"]
+    timeout = 300
+
+    def setup(self, n_files):
+        source = fixture("fits_directory", write_fits_directory, n_files=n_files)
+        self.source_file = os.path.join(source, sorted(os.listdir(source))[0])
+        self.directory = tempfile.mkdtemp()
+        for name in os.listdir(source):
+            os.link(os.path.join(source, name), os.path.join(self.directory, name))
+        self.watcher = DirectoryWatcher(self.directory)
+        self.watcher.poll()
+        self.arrivals = 0
+
+    def teardown(self, n_files):
+        shutil.rmtree(self.directory)
+
+    def time_poll_nothing_new(self, n_files):
+        self.watcher.poll()
+
+    def time_poll_one_arrival(self, n_files):
+        self.arrivals += 1
+        os.link(self.source_file, os.path.join(self.directory, f"arrival_{self.arrivals:06d}_uncal.fits"))
+        self.watcher.poll()
+
+    def time_find_file_types_after_arrival(self, n_files):
+        self.arrivals += 1
+        os.link(self.source_file, os.path.join(self.directory, f"arrival_{self.arrivals:06d}_uncal.fits"))
+        Find_File_Types(self.directory, verbose=False)
+
+
+class CalconSets:
+    params = [[6, 60], [50, 1000]]
+    param_names = ["n_sets", "n_separations"]
+
+    def setup(self, n_sets, n_separations):
+        self.directory = fixture("calcon", write_calcon_directory, n_sets=n_sets, n_separations=n_separations)
+
+    def time_load_every_set(self, n_sets, n_separations):
+        index = CalconIndex(self.directory)
+        for calcon_set in index.sets():
+            index.get(calcon_set["differential_imaging_method"], calcon_set["number_of_annuli"], calcon_set["number_of_subsections"],
+                      tag=calcon_set["tag"])
+
+    def peakmem_load_every_set(self, n_sets, n_separations):
+        self.time_load_every_set(n_sets, n_separations)
@@ -0,0 +1,80 @@
+'''
+Time and memory of matching groups between ramps (FindNumberOfGroups.FindNumGroups and FindNumGroups_batch),
+scaling with the number of groups, the frame size and the number of files.
+Run with asv (see asv.conf.json), e.g. `asv run --bench FindNumGroups`
+'''
+import glob
+import os
+
+from Astrophysics_Tools.FindNumberOfGroups import FindNumGroups, FindNumGroups_batch
+
+from .fixtures import fixture, write_ramp_directory
+
+
+class FindNumGroupsRamps:
+    params = [[10, 100], [64, 256], ["Crop", "Full"]]
+    param_names = ["ngroups", "size", "Load_Mode"]
+    timeout = 300
+
+    def setup(self, ngroups, size, Load_Mode):
+        directory = fixture("ramps", write_ramp_directory, n_files=1, ngroups=ngroups, size=size)
+        self.ref = os.path.join(directory, "ref_000.fits")
+        self.sci = os.path.join(directory, "sci_000.fits")
+
+    def time_find_num_groups(self, ngroups, size, Load_Mode):
+        FindNumGroups(self.ref, self.sci, False, verbose=False, Load_Mode=Load_Mode)
+
+    def peakmem_find_num_groups(self, ngroups, size, Load_Mode):
+        FindNumGroups(self.ref, self.sci, False, verbose=False, Load_Mode=Load_Mode)
+
+    def track_traced_peak_bytes(self, ngroups, size, Load_Mode):
+        # Python side allocations only (tracemalloc), unlike peakmem_ which is the whole process
+        usage = {}
+        FindNumGroups(self.ref, self.sci, False, verbose=False, Load_Mode=Load_Mode, memory_hook=usage.update)
+        return usage["peak_bytes"]
+    track_traced_peak_bytes.unit = "bytes"
+
+    def track_best_group(self, ngroups, size, Load_Mode):
+        return FindNumGroups(self.ref, self.sci, False, verbose=False, Load_Mode=Load_Mode)
+
+
+class FindNumGroupsBatch:
+    params = [[2, 8], [1, 4]]
+    param_names = ["n_files", "max_workers"]
+    timeout = 300
+
+    def setup(self, n_files, max_workers):
+        directory = fixture("ramps", write_ramp_directory, n_files=n_files, ngroups=30, size=128)
+        self.science = sorted(glob.glob(os.path.join(directory, "sci_*.fits")))
+        self.reference = sorted(glob.glob(os.path.join(directory, "ref_*.fits")))
+
+    def time_find_num_groups_batch(self, n_files, max_workers):
+        FindNumGroups_batch(self.science, self.reference, Methods=("Summed", "MaxPixel"), max_workers=max_workers, verbose=False)
+
+    def peakmem_find_num_groups_batch(self, n_files, max_workers):
+        FindNumGroups_batch(self.science, self.reference, Methods=("Summed", "MaxPixel"), max_workers=max_workers, verbose=False)
+
+
+class FindNumGroupsIntegrations:
+    params = [[2, 10], ["per integration", "mean", "median"]]
+    param_names = ["nints", "Stack"]
+    timeout = 300
+
+    def setup(self, nints, Stack):
+        directory = fixture("ramps", write_ramp_directory, n_files=1, nints=nints, ngroups=50, size=256)
+        self.ref = os.path.join(directory, "ref_000.fits")
+        self.sci = os.path.join(directory, "sci_000.fits")
+        self.Stack = None if Stack == "per integration" else Stack
+
+    def time_find_num_groups_all_integrations(self, nints, Stack):
+        FindNumGroups(self.ref, self.sci, False, verbose=False, Integrations="all", Stack=self.Stack)
+
+    def peakmem_find_num_groups_all_integrations(self, nints, Stack):
+        FindNumGroups(self.ref, self.sci, False, verbose=False, Integrations="all", Stack=self.Stack)
+
+    def time_find_num_groups_one_call_per_integration(self, nints, Stack):
+        # what the noise analysis did before: a separate call (and file read) for every integration
+        if self.Stack is not None:
+            raise NotImplementedError
+        for integration in range(nints):
+            FindNumGroups(self.ref, self.sci, False, verbose=False, Integrations=integration)
@@ -0,0 +1,34 @@
+'''
+Per call overhead of Function_Tools.enforce_types, against the undecorated function and with enforcement switched off.
+Run with asv (see asv.conf.json), e.g. `asv run --bench EnforceTypes`
+'''
+import numpy as np
+
+from Astrophysics_Tools import Function_Tools
+from Astrophysics_Tools.Function_Tools import enforce_types
+
+
+def _small_function(data: np.ndarray, scale: float = 1.0, name: str = "frame") -> np.ndarray:
+    return data
+
+
+class EnforceTypes:
+    params = [["undecorated", "enforced", "disabled"], ["positional", "keyword"]]
+    param_names = ["mode", "call"]
+
+    def setup(self, mode, call):
+        self.data = np.zeros((4, 4))
+        if mode == "undecorated":
+            self.function = _small_function
+        else:
+            self.function = enforce_types(_small_function)
+        Function_Tools.set_type_enforcement(mode != "disabled")
+
+    def teardown(self, mode, call):
+        Function_Tools.set_type_enforcement(True)
+
+    def time_call(self, mode, call):
+        if call == "positional":
+            self.function(self.data, 2.0)
+        else:
+            self.function(self.data, scale=2.0)
@@ -0,0 +1,31 @@
+'''
+Import time of the package and of the entry points a worker process typically needs, each in a fresh interpreter.
+The submodules and their heavy dependencies (astroquery, pandas, scipy) are only imported on first use, see Astrophysics_Tools/__init__.py.
+Run with asv (see asv.conf.json), e.g. `asv run --bench ImportTime`
+'''
+
+
+class ImportTime:
+    timeout = 120
+
+    def timeraw_import_package(self):
+        return "import Astrophysics_Tools"
+
+    def timeraw_import_find_num_groups(self):
+        return "from Astrophysics_Tools import FindNumGroups"
+
+    def timeraw_import_mag_to_mass(self):
+        return "from Astrophysics_Tools import Mag_to_Mass"
+
+    def timeraw_import_find_file_types(self):
+        return "from Astrophysics_Tools import Find_File_Types"
+
+    def timeraw_import_tools(self):
+        return "from Astrophysics_Tools import Cookie_Cutter_Mask"
+
+    def timeraw_import_everything(self):
+        return "from Astrophysics_Tools import *"
+
+    def timeraw_first_simbad_query_setup(self):
+        # the cost moved out of the package import: astroquery is imported when the first query is set up
+        return "from Astrophysics_Tools.Tools import _simbad; _simbad()"
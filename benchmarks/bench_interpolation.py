@@ -0,0 +1,39 @@
+'''
+Speed and accuracy of MagToMass.InterpolateTheData (nearest point of a linspace) against Evaluate_Spline/Invert_Spline.
+Run with asv (see asv.conf.json), e.g. `asv run --bench Interpolation`
+'''
+import numpy as np
+
+from Astrophysics_Tools.MagToMass import InterpolateTheData, Evaluate_Spline, Invert_Spline
+
+
+class Interpolation:
+    params = [[10, 100, 1000], [1000, 10000]]
+    param_names = ["n_values", "steps"]
+
+    def setup(self, n_values, steps):
+        # A smooth, monotonic mag-mass like relation with an analytic answer to compare against
+        self.xi = np.linspace(10, 25, 40)
+        self.yi = np.exp(-self.xi / 4)
+        self.wanted = np.random.default_rng(0).uniform(10, 25, n_values)
+        self.truth = np.exp(-self.wanted / 4)
+
+    def time_linspace_nearest(self, n_values, steps):
+        for value in self.wanted:
+            InterpolateTheData(value, self.xi, self.yi, steps=steps)
+
+    def time_evaluate_spline(self, n_values, steps):
+        Evaluate_Spline(self.wanted, self.xi, self.yi)
+
+    def time_invert_spline(self, n_values, steps):
+        Invert_Spline(self.truth, self.xi, self.yi)
+
+    def track_linspace_nearest_max_relative_error(self, n_values, steps):
+        found = np.array([InterpolateTheData(value, self.xi, self.yi, steps=steps) for value in self.wanted])
+        return float(np.max(np.abs(found / self.truth - 1)))
+
+    def track_evaluate_spline_max_relative_error(self, n_values, steps):
+        return float(np.max(np.abs(Evaluate_Spline(self.wanted, self.xi, self.yi) / self.truth - 1)))
+
+    def track_invert_spline_max_error(self, n_values, steps):
+        return float(np.max(np.abs(Invert_Spline(self.truth, self.xi, self.yi) - self.wanted)))
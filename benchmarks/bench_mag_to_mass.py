@@ -0,0 +1,111 @@
+'''
+Time and memory of turning magnitudes into masses (MagToMass), against the number of magnitudes and the size of the model grid.
+The models are synthetic ATMO 2020 style tracks, ATMO_2020_MODELS is pointed at them for the benchmark.
+Run with asv (see asv.conf.json), e.g. `asv run --bench MagToMass`
+'''
+import os
+
+import numpy as np
+
+from Astrophysics_Tools import MagToMass
+from Astrophysics_Tools.MagToMass import (Mag_to_Mass, Mag_to_Mass_Array, Load_Model_Grid, Clear_Model_Grid_Cache,
+                                          Load_Mag_Mass_Tables, MagMassTables)
+
+from .fixtures import atmo_models_path
+
+
+class _ModelsFixture:
+    def setup_models(self, n_masses=40, n_ages=60):
+        self._models_before = os.environ.get("ATMO_2020_MODELS")
+        os.environ["ATMO_2020_MODELS"] = atmo_models_path(n_masses=n_masses, n_ages=n_ages)
+        Clear_Model_Grid_Cache()
+
+    def teardown(self, *params):
+        if self._models_before is None:
+            os.environ.pop("ATMO_2020_MODELS", None)
+        else:
+            os.environ["ATMO_2020_MODELS"] = self._models_before
+        Clear_Model_Grid_Cache()
+
+
+class MagToMassMagnitudes(_ModelsFixture):
+    params = [[1, 100, 10000]]
+    param_names = ["n_magnitudes"]
+
+    def setup(self, n_magnitudes):
+        self.setup_models()
+        Load_Model_Grid("NIRCAM", "MASK335R")  # parsed once, as in any session converting more than one value
+        self.magnitudes = np.random.default_rng(0).uniform(16, 24, n_magnitudes)
+
+    def time_mag_to_mass(self, n_magnitudes):
+        if n_magnitudes > 100:
+            raise NotImplementedError  # one call per value, too slow to be worth timing at this size
+        for magnitude in self.magnitudes:
+            Mag_to_Mass(500, magnitude, Verbose=False)
+
+    def time_mag_to_mass_array(self, n_magnitudes):
+        Mag_to_Mass_Array(500, self.magnitudes, Verbose=False)
+
+    def peakmem_mag_to_mass_array(self, n_magnitudes):
+        Mag_to_Mass_Array(500, self.magnitudes, Verbose=False)
+
+    def track_mean_mass_mjup(self, n_magnitudes):
+        return float(np.nanmean(Mag_to_Mass_Array(500, self.magnitudes, Verbose=False)))
+
+
+class ModelGridLoad(_ModelsFixture):
+    params = [[40, 200], [60, 300]]
+    param_names = ["n_masses", "n_ages"]
+
+    def setup(self, n_masses, n_ages):
+        self.setup_models(n_masses, n_ages)
+
+    def time_load_model_grid_cold(self, n_masses, n_ages):
+        Clear_Model_Grid_Cache()
+        Load_Model_Grid("NIRCAM", "MASK335R")
+
+    def peakmem_load_model_grid_cold(self, n_masses, n_ages):
+        Clear_Model_Grid_Cache()
+        Load_Model_Grid("NIRCAM", "MASK335R")
+
+    def time_load_models_text_tracks(self, n_masses, n_ages):
+        # parsing the text tracks, skipping any binary grid written by Convert_Models_To_Binary
+        MagToMass.ModelGrid.From_Directory(MagToMass.Load_Models("NIRCAM", "MASK335R"))
+
+
+class MagMassTablesLookup(_ModelsFixture):
+    # thousands of synthetic companions, each at its own age, in both directions
+    params = [[100, 10000, 1000000]]
+    param_names = ["n_companions"]
+
+    def setup(self, n_companions):
+        self.setup_models()
+        self.tables = Load_Mag_Mass_Tables("NIRCAM", "MASK335R")
+        rng = np.random.default_rng(0)
+        self.ages = rng.uniform(20, 5000, n_companions)
+        self.magnitudes = rng.uniform(16, 24, n_companions)
+        self.masses = rng.uniform(1, 60, n_companions)
+
+    def time_build_tables(self, n_companions):
+        MagMassTables(Load_Model_Grid("NIRCAM", "MASK335R"))
+
+    def time_mag_to_mass_tables(self, n_companions):
+        self.tables.Mag_to_Mass(self.ages, self.magnitudes)
+
+    def time_mag_to_mass_array(self, n_companions):
+        if n_companions > 10000:
+            raise NotImplementedError  # a spline per distinct age, too slow to be worth timing at this size
+        Mag_to_Mass_Array(self.ages, self.magnitudes, Verbose=False)
+
+    def time_mass_to_mag_tables(self, n_companions):
+        self.tables.Mass_to_Mag(self.ages, self.masses, "NIRCAM-F444W")
+
+    def time_mass_to_mag_every_filter(self, n_companions):
+        self.tables.Mass_to_Mag(self.ages, self.masses)
+
+    def peakmem_mass_to_mag_every_filter(self, n_companions):
+        self.tables.Mass_to_Mag(self.ages, self.masses)
+
+    def track_round_trip_max_error_mag(self, n_companions):
+        masses = self.tables.Mag_to_Mass(self.ages, self.magnitudes)
+        return float(np.nanmax(np.abs(self.tables.Mass_to_Mag(self.ages, masses, "NIRCAM-F444W") - self.magnitudes)))
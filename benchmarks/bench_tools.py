@@ -0,0 +1,112 @@
+'''
+Time and memory of the Tools functions: masking frames and cubes (Cookie_Cutter_Mask), catalogue temperatures and peak
+wavelengths (Ballesteros, Wiens_Law_Microns) against the row-wise pandas apply they replace, and the batched SIMBAD/MAST
+queries and separations against stand-in services (see fixtures.MockSimbad/MockObservations) so no network is used.
+Run with asv (see asv.conf.json), e.g. `asv run --bench CookieCutterMask`
+'''
+import numpy as np
+from astropy.table import Table
+
+from Astrophysics_Tools.Tools import (Cookie_Cutter_Mask, Cookie_Cutter_Mask_Cube, Ballesteros, Wiens_Law_Microns,
+                                      Ballesteros_Chunked, get_observed_filters_batch, separation_matrix, pairs_within)
+
+from .fixtures import MockSimbad, MockObservations, target_names, catalog_path
+
+
+class CookieCutterMask:
+    params = [[1, 10, 100], [256, 1024]]
+    param_names = ["n_frames", "size"]
+
+    def setup(self, n_frames, size):
+        self.cube = np.random.default_rng(0).normal(size=(n_frames, size, size)).astype(np.float32)
+        y, x = np.mgrid[:size, :size]
+        self.mask = (((x - size / 2) ** 2 + (y - size / 2) ** 2) < (size / 4) ** 2).astype(float)
+        self.out = np.empty_like(Cookie_Cutter_Mask_Cube(self.cube, self.mask))
+
+    def time_cookie_cutter_mask_per_frame(self, n_frames, size):
+        for frame in self.cube:
+            Cookie_Cutter_Mask(frame, self.mask)
+
+    def time_cookie_cutter_mask_cube(self, n_frames, size):
+        Cookie_Cutter_Mask_Cube(self.cube, self.mask)
+
+    def time_cookie_cutter_mask_cube_out(self, n_frames, size):
+        Cookie_Cutter_Mask_Cube(self.cube, self.mask, out=self.out)
+
+    def peakmem_cookie_cutter_mask_per_frame(self, n_frames, size):
+        [Cookie_Cutter_Mask(frame, self.mask) for frame in self.cube]
+
+    def peakmem_cookie_cutter_mask_cube(self, n_frames, size):
+        Cookie_Cutter_Mask_Cube(self.cube, self.mask)
+
+
+class CatalogTemperatures:
+    params = [[10**5, 10**7]]
+    param_names = ["n_rows"]
+    timeout = 1200  # the row-wise apply takes minutes on 10^7 rows
+
+    def setup(self, n_rows):
+        self.path = catalog_path(n_rows)
+        self.table = Table.read(self.path)
+        self.frame = self.table.to_pandas()
+        self.out = np.empty(n_rows)
+
+    def time_ballesteros_row_wise(self, n_rows):
+        self.frame.apply(lambda row: Ballesteros(row["B"], row["V"]), axis=1)
+
+    def time_ballesteros(self, n_rows):
+        Ballesteros(self.frame["B"], self.frame["V"])
+
+    def time_ballesteros_out(self, n_rows):
+        Ballesteros(self.frame["B"], self.frame["V"], out=self.out)
+
+    def time_ballesteros_quantity_columns(self, n_rows):
+        Ballesteros(self.table["B"], self.table["V"])
+
+    def time_ballesteros_chunked(self, n_rows):
+        for temperatures in Ballesteros_Chunked(self.path):
+            pass
+
+    def peakmem_ballesteros_out(self, n_rows):
+        Ballesteros(self.frame["B"], self.frame["V"], out=self.out)
+
+    def peakmem_ballesteros_chunked(self, n_rows):
+        for temperatures in Ballesteros_Chunked(self.path):
+            pass
+
+    def time_wiens_law_row_wise(self, n_rows):
+        self.frame["teff"].apply(Wiens_Law_Microns)
+
+    def time_wiens_law(self, n_rows):
+        Wiens_Law_Microns(self.frame["teff"], out=self.out)
+
+
+class ObservationQueries:
+    params = [[10, 100], [0.0, 0.01]]
+    param_names = ["n_targets", "latency"]
+
+    def setup(self, n_targets, latency):
+        self.names = target_names(n_targets)
+        self.simbad = MockSimbad(latency)
+        self.observations = MockObservations(latency)
+
+    def time_get_observed_filters_batch(self, n_targets, latency):
+        get_observed_filters_batch(self.names, simbad=self.simbad, observations=self.observations)
+
+
+class Separations:
+    params = [[10, 100, 1000]]
+    param_names = ["n_targets"]
+
+    def setup(self, n_targets):
+        self.names = target_names(n_targets)
+        self.simbad = MockSimbad()
+
+    def time_separation_matrix(self, n_targets):
+        separation_matrix(self.names, simbad=self.simbad)
+
+    def peakmem_separation_matrix(self, n_targets):
+        separation_matrix(self.names, simbad=self.simbad)
+
+    def time_pairs_within(self, n_targets):
+        pairs_within(self.names, 3600.0, simbad=self.simbad)
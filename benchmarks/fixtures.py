@@ -0,0 +1,204 @@
+'''
+Synthetic, JWST-like inputs for the benchmarks: directories of fits files with realistic primary headers, 4D ramps,
+ATMO 2020 style evolutionary tracks, calcon result sets, photometric catalogues, and SIMBAD/MAST stand-ins that answer without the network.
+
+Files are written once under FIXTURE_ROOT (one directory per fixture and set of parameters) and reused by later
+benchmark processes, delete the directory to regenerate them.
+'''
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+from astropy import table
+from astropy import units as u
+from astropy.io import fits
+
+FIXTURE_ROOT = os.environ.get("ASTROPHYSICS_TOOLS_BENCHMARK_FIXTURES",
+                              os.path.join(tempfile.gettempdir(), "astrophysics_tools_benchmarks"))
+
+ATMO_FILTERS = ["NIRCAM-F200W", "NIRCAM-F356W", "NIRCAM-F444W"]
+CALCON_TAG = "_JWST_NIRCAM_NRCALONG_F444W_MASKA335R"
+
+
+def fixture(name, builder, **params):
+    '''
+    Returns the directory of a fixture, calling builder(directory, **params) to write it the first time it is asked for.
+    The fixture is built in a temporary directory and moved into place, so concurrent benchmark processes never see half of one.
+    '''
+    directory = os.path.join(FIXTURE_ROOT, name + "".join(f"_{key}{value}" for key, value in sorted(params.items())))
+    if not os.path.isdir(directory):
+        os.makedirs(FIXTURE_ROOT, exist_ok=True)
+        building = tempfile.mkdtemp(dir=FIXTURE_ROOT, prefix=f".{name}_")
+        builder(building, **params)
+        try:
+            os.rename(building, directory)
+        except OSError:
+            shutil.rmtree(building)  # another process finished the same fixture first
+    return directory
+
+
+def primary_header(category, filter_name="F444W", nints=2, ngroups=10, seed=0):
+    '''A primary header with the keywords (and bulk) of a JWST NIRCam coronagraphy uncal file, for a file of the given category.'''
+    rng = np.random.default_rng(seed)
+    header = fits.Header()
+    header["TELESCOP"] = "JWST"
+    header["INSTRUME"] = "NIRCAM"
+    header["DETECTOR"] = "NRCALONG"
+    header["FILTER"] = filter_name
+    header["PUPIL"] = "MASKRND"
+    header["CORONMSK"] = "MASKA335R"
+    header["EXP_TYPE"] = "NRC_TACQ" if category == "TA" else "NRC_CORON"
+    header["TARGPROP"] = {"Science": "HD-0001", "Reference": "HD-0002", "Background": "BKG-0001", "TA": "HD-0001"}[category]
+    header["BKGDTARG"] = category == "Background"
+    header["IS_PSF"] = category == "Reference"
+    header["NINTS"] = nints
+    header["NGROUPS"] = ngroups
+    header["NFRAMES"] = 1
+    header["READPATT"] = "MEDIUM8"
+    header["SUBARRAY"] = "SUB320A335R"
+    header["DATE-OBS"] = "2023-01-01"
+    header["EFFEXPTM"] = float(rng.uniform(100, 1000))
+    # The real headers carry a few hundred more keywords, which is most of what reading a header costs
+    for i in range(250):
+        header[f"KEY{i:05d}"] = (float(rng.normal()), "filler keyword")
+    return header
+
+
+def write_fits_directory(directory, n_files=20, seed=0):
+    '''Writes n_files header-only uncal files, cycling through the science/reference/background/TA categories.'''
+    categories = ["Science", "Reference", "Reference", "Background", "TA"]
+    for i in range(n_files):
+        header = primary_header(categories[i % len(categories)], seed=seed + i)
+        fits.PrimaryHDU(header=header).writeto(os.path.join(directory, f"jw01234{i:05d}_uncal.fits"))
+
+
+def write_ramp(path, nints=2, ngroups=10, size=64, scale=1.0, dtype=np.float32, seed=0):
+    '''
+    Writes a (nints, ngroups, size, size) ramp of a PSF brightening linearly with group, plus noise, into a SCI extension.
+    CRPIX1/CRPIX2 point at the PSF, as they do for coronagraphic data.
+    '''
+    rng = np.random.default_rng(seed)
+    cx, cy = size // 2, size // 2 - 2
+    y, x = np.mgrid[:size, :size]
+    psf = np.exp(-((x - cx) ** 2 + (y - cy) ** 2) / 20.0) * 1000 * scale
+    data = np.empty((nints, ngroups, size, size), dtype=dtype)
+    for integration in range(nints):
+        for group in range(ngroups):
+            data[integration, group] = psf * (group + 1) / ngroups * (1 + 0.1 * integration) + rng.normal(0, 2, psf.shape)
+    header = fits.Header()
+    header["CRPIX1"] = cx
+    header["CRPIX2"] = cy
+    fits.HDUList([fits.PrimaryHDU(header=primary_header("Science", nints=nints, ngroups=ngroups, seed=seed)),
+                  fits.ImageHDU(data, header=header, name="SCI")]).writeto(path)
+
+
+def write_ramp_directory(directory, n_files=2, nints=2, ngroups=10, size=64):
+    '''Writes n_files science ramps (sci_*.fits) and n_files brighter, longer reference ramps (ref_*.fits).'''
+    for i in range(n_files):
+        write_ramp(os.path.join(directory, f"sci_{i:03d}.fits"), nints, ngroups, size, scale=1.0, seed=2 * i)
+        write_ramp(os.path.join(directory, f"ref_{i:03d}.fits"), nints, ngroups, size, scale=1.5, seed=2 * i + 1)
+
+
+def write_atmo_models(directory, n_masses=40, n_ages=60, filters=ATMO_FILTERS):
+    '''
+    Writes ATMO 2020 style tracks (one file per mass, columns Mass, Age, Teff, Luminosity and the filters) where
+    MagToMass.Load_Models looks for NIRCam MASK335R models. Point ATMO_2020_MODELS at directory + "/" to use them.
+    '''
+    track_dir = os.path.join(directory, "evolutionary_tracks", "ATMO_CEQ", "JWST_coronagraphy", "JWST_coron_NIRCAM_MASK335R")
+    os.makedirs(track_dir)
+    for k, mass in enumerate(np.geomspace(0.0005, 0.075, n_masses)):
+        ages = np.geomspace(0.001, 10, n_ages)[k % 5:]  # the real tracks have different lengths
+        lines = ["# Mass Age Teff Luminosity " + " ".join(filters),
+                 "# (Msun) (Gyr) (K) (Lsun) " + " ".join(["(mag)"] * len(filters))]
+        for age in ages:
+            mags = [25 - 8 * np.log10(mass / 0.0005) / 2.18 + 2.5 * np.log10(age / 0.001) / 4 + 0.3 * j for j in range(len(filters))]
+            lines.append(f"{mass:.6f} {age:.6f} {1000 * mass ** 0.5 * age ** -0.1:.2f} {-5 + np.log10(mass):.4f} "
+                         + " ".join(f"{mag:.4f}" for mag in mags))
+        with open(os.path.join(track_dir, f"{mass:.6f}_ATMO.txt"), "w") as track_file:
+            track_file.write("\n".join(lines) + "\n")
+
+
+def atmo_models_path(n_masses=40, n_ages=60):
+    '''The fixture directory of write_atmo_models, in the form ATMO_2020_MODELS expects (with a trailing separator).'''
+    return fixture("atmo", write_atmo_models, n_masses=n_masses, n_ages=n_ages) + os.sep
+
+
+def write_calcon_directory(directory, n_sets=6, n_separations=50, klmodes=(1, 5, 10, 20)):
+    '''Writes n_sets spaceKLIP calcon result sets (separations, contrasts, mask corrected contrasts and an injection file).'''
+    methods = ["ADI+RDI", "RDI", "ADI"]
+    for i in range(n_sets):
+        method, annuli = methods[i % len(methods)], i // len(methods) + 1
+        name = f"{method}_NANNU{annuli}_NSUBS1{CALCON_TAG}"
+        prefix = os.path.join(directory, f"{name}-KLmodes-all_cal_")
+        separations = np.linspace(0.3, 5, n_separations)
+        contrasts = np.array([1e-3 * np.exp(-separations) * (1 + 0.1 * j) + 1e-7 for j in range(len(klmodes))])
+        np.save(prefix + "seps.npy", separations)
+        np.save(prefix + "cons.npy", contrasts)
+        np.save(prefix + "maskcons.npy", contrasts * 1.2)
+        os.makedirs(os.path.join(directory, name))
+        header = fits.Header()
+        for j, klmode in enumerate(klmodes):
+            header[f"KLMODE{j}"] = klmode
+        fits.PrimaryHDU(header=header).writeto(os.path.join(directory, name, "injected.fits"))
+
+
+def write_catalog(directory, n_rows=10**6, seed=0):
+    '''Writes a Gaia/2MASS-like photometric catalogue (B, V in mag and teff in K) as a fits table, catalog.fits.'''
+    rng = np.random.default_rng(seed)
+    b_mag = rng.uniform(5, 18, n_rows)
+    table.Table({"B": b_mag * u.mag, "V": (b_mag - rng.uniform(-0.3, 2.0, n_rows)) * u.mag,
+                 "teff": rng.uniform(2500, 40000, n_rows) * u.K}).write(os.path.join(directory, "catalog.fits"))
+
+
+def catalog_path(n_rows=10**6):
+    return os.path.join(fixture("catalog", write_catalog, n_rows=n_rows), "catalog.fits")
+
+
+class MockSimbad:
+    '''Answers query_object(s) like astroquery's Simbad, with made up coordinates, after latency seconds per call.'''
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def get_votable_fields(self):
+        return ["main_id", "ra", "dec"]
+
+    def query_objects(self, names):
+        self.calls += 1
+        time.sleep(self.latency)
+        rng = np.random.default_rng(len(names))
+        return table.Table({"main_id": [f"NAME {name}" for name in names],
+                            "ra": rng.uniform(0, 360, len(names)),
+                            "dec": np.degrees(np.arcsin(rng.uniform(-1, 1, len(names)))),
+                            "user_specified_id": list(names)})
+
+    def query_object(self, name):
+        return self.query_objects([name])
+
+
+class MockObservations:
+    '''Answers list_missions/query_criteria like astroquery's Observations, sleeping latency seconds per query (as a round trip would).'''
+    def __init__(self, latency=0.0, rows=20):
+        self.latency = latency
+        self.rows = rows
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def list_missions(self):
+        return ["HST", "JWST", "TESS"]
+
+    def query_criteria(self, objectname, obs_collection):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        filters = ["F444W;MASKRND", "F356W;MASKRND", "F200W;CLEAR", "F1550C;MASKFQPM"]
+        return table.Table({"obs_collection": [obs_collection if obs_collection != "*" else "JWST"] * self.rows,
+                            "filters": [filters[i % len(filters)] for i in range(self.rows)],
+                            "target_name": [objectname] * self.rows})
+
+
+def target_names(n_targets):
+    return [f"HD {100000 + i}" for i in range(n_targets)]